@@ -5,23 +5,110 @@ Handles encryption/decryption transparently for configured endpoints
 
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import ClientDisconnect
 from starlette.responses import JSONResponse
+from starlette.types import Message, Receive, Scope, Send
+import hashlib
 import json
-from typing import Callable, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
 import logging
 
 from app.utils.encryption import (
-    decrypt_request,
-    encrypt_response,
+    decrypt_body,
+    encrypt_body,
     is_request_encrypted,
     DecryptionError,
     SignatureVerificationError,
     mask_sensitive_data,
     EncryptionConfig
 )
+from app.utils.ciphers import negotiate_algorithm
+from app.utils.etag import compute_etag, digest_cache, etag_matches
+from app.utils.field_encryption import FieldPathError, encrypt_fields, parse_field_path
+from app.utils.metrics import encryption_metrics
+from app.utils.rate_limit import SharedTokenBucketLimiter
+from app.utils.shared_state import open_table
+from app.utils.response_cache import CachedResponse, ResponseCache, response_cache
+from app.routes.media import MediaConfig
 
 logger = logging.getLogger(__name__)
 
+# Methods whose bodies may carry an encrypted envelope
+BODY_METHODS = ("POST", "PUT", "PATCH")
+
+# Request: comma-separated AEAD IDs the client can decrypt; response: the one used
+ALGORITHM_HEADER = "x-encryption-algorithm"
+
+# Methods whose encrypted responses get ETags and honour If-None-Match
+CONDITIONAL_METHODS = ("GET", "HEAD")
+
+# Response: "body" (whole-body envelope) or "fields" (field-level tokens)
+ENCRYPTION_MODE_HEADER = "x-encryption-mode"
+
+
+class ClientShedError(Exception):
+    """Exception raised when an envelope comes from a client that exhausted its decryption-failure budget"""
+    pass
+
+
+def is_json_content_type(content_type: str) -> bool:
+    """Check if a Content-Type header denotes a JSON body (application/json or +json)"""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type == "application/json" or media_type.endswith("+json")
+
+
+def limit_receive(
+    receive: Receive,
+    max_body_size: int,
+    on_too_large: Callable[[], Awaitable[None]],
+) -> Receive:
+    """
+    Wrap an ASGI receive callable so the body is counted while it streams
+
+    Once the limit is exceeded, on_too_large is awaited (it answers 413) and the
+    reader gets http.disconnect from then on, as if the client had gone away, so
+    the route stops reading without an error of ours reaching the app's handlers.
+
+    Args:
+        receive: ASGI receive callable
+        max_body_size: Maximum number of body bytes allowed
+        on_too_large: Called once when the limit is first exceeded
+
+    Returns:
+        Receive callable that enforces the limit
+    """
+    received = 0
+    exceeded = False
+
+    async def limited_receive() -> Message:
+        nonlocal received, exceeded
+        if exceeded:
+            return {"type": "http.disconnect"}
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_body_size:
+                exceeded = True
+                await on_too_large()
+                return {"type": "http.disconnect"}
+        return message
+
+    return limited_receive
+
+
+def body_too_large_response(max_body_size: int) -> JSONResponse:
+    """Build the 413 response returned for oversize request bodies"""
+    return JSONResponse(
+        status_code=413,
+        content={
+            "success": False,
+            "error": {
+                "message": f"Request body too large (limit: {max_body_size} bytes)",
+                "code": "PAYLOAD_TOO_LARGE"
+            }
+        }
+    )
+
 
 class EncryptionMiddleware(BaseHTTPMiddleware):
     """
@@ -56,7 +143,54 @@ class EncryptionMiddleware(BaseHTTPMiddleware):
         "/api/newsletter/subscribe",
     ]
 
-    def __init__(self, app, sensitive_endpoints: Optional[List[str]] = None, public_endpoints: Optional[List[str]] = None):
+    # Per-route field encryption specs: only these fields are encrypted in the
+    # response, the rest stays plain JSON (routes not listed use whole-body mode)
+    # Example: {"/profile": ["$.access_token", "$.payment.*"]}
+    FIELD_ENCRYPTION_SPECS: Dict[str, List[str]] = {}
+
+    # Per-route maximum request body sizes in bytes (longest matching prefix wins)
+    MAX_BODY_SIZES = {
+        "/auth": 64 * 1024,  # 64 KB
+        "/user/settings": 256 * 1024,  # 256 KB
+        "/profile": 256 * 1024,  # 256 KB
+        "/api/newsletter/subscribe": 16 * 1024,  # 16 KB
+    }
+
+    # Sensitive endpoints whose GET responses are cached per user (plaintext,
+    # re-encrypted on every hit; see app.utils.response_cache)
+    CACHED_ENDPOINTS = [
+        "/profile",
+        "/subscription",
+        "/user/settings",
+    ]
+
+    # Cached endpoints dropped when a write to another endpoint succeeds
+    # (a write always drops the user's entries under its own sensitive prefix)
+    CACHE_INVALIDATIONS: Dict[str, List[str]] = {
+        "/auth/change-password": ["/profile"],
+        "/payment": ["/subscription"],
+        "/user/settings": ["/profile"],
+    }
+
+    # Endpoints whose requests/responses bypass the middleware entirely
+    # (streamed media must not be buffered or re-wrapped)
+    PASSTHROUGH_ENDPOINTS = [
+        MediaConfig.ROUTE_PREFIX,
+    ]
+
+    def __init__(
+        self,
+        app,
+        sensitive_endpoints: Optional[List[str]] = None,
+        public_endpoints: Optional[List[str]] = None,
+        passthrough_endpoints: Optional[List[str]] = None,
+        max_body_sizes: Optional[Dict[str, int]] = None,
+        default_max_body_size: Optional[int] = None,
+        field_encryption_specs: Optional[Dict[str, List[str]]] = None,
+        cached_endpoints: Optional[List[str]] = None,
+        cache_invalidations: Optional[Dict[str, List[str]]] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         """
         Initialize encryption middleware
 
@@ -64,6 +198,13 @@ class EncryptionMiddleware(BaseHTTPMiddleware):
             app: FastAPI application
             sensitive_endpoints: List of endpoints that should always be encrypted
             public_endpoints: List of endpoints that should never be encrypted
+            passthrough_endpoints: List of endpoints passed to the app untouched
+            max_body_sizes: Per-route maximum request body sizes in bytes
+            default_max_body_size: Body size limit for routes not in max_body_sizes
+            field_encryption_specs: Per-route field paths to encrypt instead of the whole body
+            cached_endpoints: Sensitive endpoints whose GET responses are cached per user
+            cache_invalidations: Write endpoint prefixes to the cached endpoints they invalidate
+            cache: Response cache (defaults to the shared app.utils.response_cache.response_cache)
         """
         super().__init__(app)
 
@@ -73,15 +214,158 @@ class EncryptionMiddleware(BaseHTTPMiddleware):
         if public_endpoints:
             self.PUBLIC_ENDPOINTS = public_endpoints
 
+        if passthrough_endpoints:
+            self.PASSTHROUGH_ENDPOINTS = passthrough_endpoints
+
+        if max_body_sizes:
+            self.MAX_BODY_SIZES = max_body_sizes
+
+        self.default_max_body_size = default_max_body_size or EncryptionConfig.MAX_BODY_SIZE
+
+        if field_encryption_specs:
+            self.FIELD_ENCRYPTION_SPECS = field_encryption_specs
+
+        # Malformed field paths fail at startup instead of on the route's first response
+        for endpoint, field_paths in self.FIELD_ENCRYPTION_SPECS.items():
+            for field_path in field_paths:
+                try:
+                    parse_field_path(field_path)
+                except FieldPathError as e:
+                    raise FieldPathError(f"Invalid field encryption spec for {endpoint}: {e}") from e
+
+        if cached_endpoints is not None:
+            self.CACHED_ENDPOINTS = cached_endpoints
+
+        if cache_invalidations is not None:
+            self.CACHE_INVALIDATIONS = cache_invalidations
+
+        # Plaintext responses per (route, user) for cached GET endpoints
+        self.response_cache = cache or response_cache
+
+        # Recent plaintext ETags per (route, user) for cheap conditional requests;
+        # invalidated in every worker through app.utils.cache_invalidation
+        self.etag_cache = digest_cache
+
+        # Clients that keep sending undecryptable envelopes are shed before any crypto
+        # runs; with SHARED_STATE_NAME set the budget is shared by all workers on the
+        # host (see app.utils.shared_state)
+        shared_state_name = EncryptionConfig.SHARED_STATE_NAME
+        self.failure_limiter = open_table(
+            SharedTokenBucketLimiter,
+            f"{shared_state_name}-failures" if shared_state_name else None,
+            capacity=EncryptionConfig.DECRYPTION_FAILURE_BURST,
+            refill_rate=EncryptionConfig.DECRYPTION_FAILURE_REFILL_PER_SECOND,
+            slots=EncryptionConfig.DECRYPTION_FAILURE_SLOTS,
+        )
+
         logger.info(f"Encryption middleware initialized (enabled: {EncryptionConfig.ENCRYPTION_ENABLED})")
 
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Gate requests before any body is read
+
+        Passthrough endpoints go straight to the app so their responses are not
+        buffered. Bodies whose Content-Length exceeds the route limit are rejected
+        with 413 up front; all other bodies (JSON or not, e.g. chunked uploads) are
+        counted while they stream and answered with 413 as soon as the limit is
+        crossed. Routes not in MAX_BODY_SIZES get default_max_body_size (1 MB).
+        """
+        if scope["type"] != "http" or self.is_passthrough_endpoint(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] not in BODY_METHODS:
+            await super().__call__(scope, receive, send)
+            return
+
+        max_body_size = self.get_max_body_size(scope["path"])
+        content_length = _header_value(scope, b"content-length")
+
+        if content_length and content_length.isdigit() and int(content_length) > max_body_size:
+            logger.warning(f"Rejected {content_length}-byte body for {scope['path']} (limit: {max_body_size})")
+            await body_too_large_response(max_body_size)(scope, receive, send)
+            return
+
+        response_started = False
+        rejected = False
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                # 413 already sent; drop whatever the route answers after the disconnect
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        async def reject() -> None:
+            # The limit can trip while the middleware or the route reads the stream;
+            # either way answer 413 as long as nothing has been sent yet
+            nonlocal rejected
+            logger.warning(f"Request body too large for {scope['path']}: limit {max_body_size} bytes")
+            if not response_started:
+                rejected = True
+                await body_too_large_response(max_body_size)(scope, receive, send)
+
+        try:
+            await super().__call__(scope, limit_receive(receive, max_body_size, reject), tracking_send)
+        except Exception as e:
+            # A route may fail on the disconnect it was handed after the 413
+            if not rejected:
+                raise
+            logger.debug(f"Ignoring {type(e).__name__} from {scope['path']} after answering 413")
+
     def is_sensitive_endpoint(self, path: str) -> bool:
         """Check if endpoint is sensitive and should be encrypted"""
         return any(path.startswith(endpoint) for endpoint in self.SENSITIVE_ENDPOINTS)
 
+    def get_sensitive_endpoint(self, path: str) -> Optional[str]:
+        """Get the sensitive endpoint prefix a path falls under, if any"""
+        for endpoint in self.SENSITIVE_ENDPOINTS:
+            if path.startswith(endpoint):
+                return endpoint
+        return None
+
     def is_public_endpoint(self, path: str) -> bool:
         """Check if endpoint is public and should not be encrypted"""
-        return any(path.startswith(endpoint) for endpoint in self.PUBLIC_ENDPOINTS)
+        # "/" is matched exactly; as a prefix it would make every endpoint public
+        return any(
+            path == endpoint if endpoint == "/" else path.startswith(endpoint)
+            for endpoint in self.PUBLIC_ENDPOINTS
+        )
+
+    def is_passthrough_endpoint(self, path: str) -> bool:
+        """Check if endpoint should bypass the middleware entirely"""
+        return any(path.startswith(endpoint) for endpoint in self.PASSTHROUGH_ENDPOINTS)
+
+    def get_field_encryption_spec(self, path: str) -> Optional[List[str]]:
+        """Get the field paths to encrypt for a route (longest matching prefix wins)"""
+        matches = [endpoint for endpoint in self.FIELD_ENCRYPTION_SPECS if path.startswith(endpoint)]
+        if not matches:
+            return None
+        return self.FIELD_ENCRYPTION_SPECS[max(matches, key=len)]
+
+    def is_cached_endpoint(self, path: str) -> bool:
+        """Check if GET responses for an endpoint may be served from the response cache"""
+        return any(path.startswith(endpoint) for endpoint in self.CACHED_ENDPOINTS)
+
+    def get_invalidated_endpoints(self, path: str) -> List[str]:
+        """Get the cached route prefixes a successful write to path makes stale"""
+        endpoints = []
+        sensitive_endpoint = self.get_sensitive_endpoint(path)
+        if sensitive_endpoint:
+            endpoints.append(sensitive_endpoint)
+        for endpoint, invalidated in self.CACHE_INVALIDATIONS.items():
+            if path.startswith(endpoint):
+                endpoints.extend(invalidated)
+        return endpoints
+
+    def get_max_body_size(self, path: str) -> int:
+        """Get the request body size limit for a path (longest matching prefix wins)"""
+        matches = [endpoint for endpoint in self.MAX_BODY_SIZES if path.startswith(endpoint)]
+        if not matches:
+            return self.default_max_body_size
+        return self.MAX_BODY_SIZES[max(matches, key=len)]
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """
@@ -100,11 +384,27 @@ class EncryptionMiddleware(BaseHTTPMiddleware):
         if self.is_public_endpoint(path):
             return await call_next(request)
 
+        client_id = get_client_id(request)
+
         # Process request decryption
         try:
-            request = await self._decrypt_request(request)
+            request = await self._decrypt_request(request, client_id)
+        except ClientShedError:
+            encryption_metrics.increment("decrypt.shed.rate_limited")
+            logger.warning(f"Shedding request to {path} from {client_id}: too many decryption failures")
+            return JSONResponse(
+                status_code=429,
+                content={
+                    "success": False,
+                    "error": {
+                        "message": "Too many invalid requests",
+                        "code": "TOO_MANY_DECRYPTION_FAILURES"
+                    }
+                }
+            )
         except (DecryptionError, SignatureVerificationError) as e:
             logger.warning(f"Request decryption failed for {path}: {e}")
+            self.failure_limiter.consume(client_id)
             return JSONResponse(
                 status_code=400,
                 content={
@@ -115,6 +415,9 @@ class EncryptionMiddleware(BaseHTTPMiddleware):
                     }
                 }
             )
+        except ClientDisconnect:
+            # Body limit crossed (answered with 413 in __call__) or the client went away
+            raise
         except Exception as e:
             logger.error(f"Unexpected error during request decryption: {e}")
             return JSONResponse(
@@ -128,36 +431,148 @@ class EncryptionMiddleware(BaseHTTPMiddleware):
                 }
             )
 
+        sensitive_endpoint = self.get_sensitive_endpoint(path)
+        conditional = (
+            sensitive_endpoint is not None
+            and request.method in CONDITIONAL_METHODS
+            and EncryptionConfig.ENCRYPTION_ENABLED
+        )
+        if_none_match = request.headers.get("if-none-match") if conditional else None
+        user_key = get_user_key(request)
+        route = str(request.url.path) + (f"?{request.url.query}" if request.url.query else "")
+
+        # Answer a revalidation from the digest cache without running the handler
+        if if_none_match:
+            cached_etag = self.etag_cache.get(route, user_key)
+            if cached_etag and etag_matches(if_none_match, cached_etag):
+                encryption_metrics.increment("etag.not_modified.cached")
+                return not_modified_response(cached_etag)
+
+        algorithm = negotiate_algorithm(
+            request.headers.get(ALGORITHM_HEADER),
+            EncryptionConfig.ALGORITHM
+        )
+
+        # Serve repeat GETs from the per-user plaintext cache (encrypted afresh below)
+        cacheable = (
+            conditional
+            and request.method == "GET"
+            and self.is_cached_endpoint(path)
+            and has_credentials(request)
+        )
+        if cacheable:
+            cached = self.response_cache.get(route, user_key)
+            if cached is not None:
+                encryption_metrics.increment("response_cache.hit")
+                if if_none_match and etag_matches(if_none_match, cached.etag):
+                    encryption_metrics.increment("etag.not_modified")
+                    return not_modified_response(cached.etag)
+
+                response = Response(content=cached.body, status_code=cached.status_code)
+                response.raw_headers = cached.raw_headers + [(b"content-length", str(len(cached.body)).encode())]
+                return await self._encrypt_conditional_response(response, path, algorithm, cached.etag)
+
+            encryption_metrics.increment("response_cache.miss")
+            cache_generation = self.response_cache.generation()
+
+        # Taken before the handler reads any data, so an ETag computed from data a
+        # concurrent write (in any worker) already replaced is never served from cache
+        etag_generation = self.etag_cache.generation() if conditional else None
+
         # Call next middleware/route handler
         response = await call_next(request)
 
+        # A successful write makes this user's cached ETags and responses for the route stale
+        if request.method not in CONDITIONAL_METHODS and response.status_code < 400:
+            for endpoint in self.get_invalidated_endpoints(path):
+                self.etag_cache.invalidate(user_key, endpoint)
+                self.response_cache.invalidate(user_key, endpoint)
+
         # Process response encryption for sensitive endpoints
-        if self.is_sensitive_endpoint(path) and isinstance(response, JSONResponse):
-            response = await self._encrypt_response(response, path)
+        if sensitive_endpoint and is_json_content_type(response.headers.get("content-type", "")):
+            etag = None
+            if conditional and response.status_code == 200:
+                # Keyed ETag over the plaintext; unchanged data skips encryption entirely
+                body = await read_response_body(response)
+                response = rebuild_response(response, body)
+                etag = compute_etag(body, route, user_key)
+                self.etag_cache.set(route, user_key, etag, etag_generation)
+
+                if cacheable and is_cacheable_response(response):
+                    stored = self.response_cache.set(
+                        route,
+                        user_key,
+                        CachedResponse(
+                            status_code=response.status_code,
+                            raw_headers=[
+                                (name, value) for name, value in response.raw_headers
+                                if name != b"content-length"
+                            ],
+                            body=body,
+                            etag=etag,
+                        ),
+                        cache_generation,
+                    )
+                    if stored:
+                        encryption_metrics.increment("response_cache.stored")
+
+                if if_none_match and etag_matches(if_none_match, etag):
+                    encryption_metrics.increment("etag.not_modified")
+                    return not_modified_response(etag)
+
+            return await self._encrypt_conditional_response(response, path, algorithm, etag)
+
+        return response
+
+    async def _encrypt_conditional_response(
+        self,
+        response: Response,
+        path: str,
+        algorithm: str,
+        etag: Optional[str],
+    ) -> Response:
+        """Encrypt a sensitive response and attach its plaintext ETag, if any"""
+        response = await self._encrypt_response(response, path, algorithm)
+
+        if etag:
+            response.headers["etag"] = etag
+            response.headers["cache-control"] = "private, no-cache"
 
         return response
 
-    async def _decrypt_request(self, request: Request) -> Request:
+    async def _decrypt_request(self, request: Request, client_id: str) -> Request:
         """
         Decrypt request body if encrypted
 
+        Only requests carrying an envelope are shed for an exhausted decryption-
+        failure budget, so the client (or everyone behind its NAT / proxy address)
+        can still send plain requests.
+
         Args:
             request: Incoming request
+            client_id: Client identifier for the decryption-failure limiter
 
         Returns:
             Request with decrypted body
 
         Raises:
+            ClientShedError: If the client exhausted its decryption-failure budget
             DecryptionError: If decryption fails
             SignatureVerificationError: If signature is invalid
         """
         # Only process POST/PUT/PATCH requests with body
-        if request.method not in ["POST", "PUT", "PATCH"]:
+        if request.method not in BODY_METHODS:
+            return request
+
+        # Encrypted envelopes are always JSON; stream everything else (e.g. multipart
+        # uploads) through to the route without buffering it here
+        if not is_json_content_type(request.headers.get("content-type", "")):
             return request
 
-        # Read request body
-        body = await request.body()
+        # Read request body (size limit is enforced while the stream is read)
+        body = await read_request_body(request)
         if not body:
+            request._body = b""
             return request
 
         try:
@@ -165,27 +580,30 @@ class EncryptionMiddleware(BaseHTTPMiddleware):
             data = json.loads(body)
 
             # Check if request is encrypted
-            if is_request_encrypted(data):
+            if is_request_encrypted(data) and EncryptionConfig.ENCRYPTION_ENABLED:
+                # Shed clients that exhausted their budget before any crypto runs
+                if not self.failure_limiter.is_allowed(client_id):
+                    raise ClientShedError(f"Client {client_id} exhausted its decryption-failure budget")
+
                 logger.info(f"Decrypting request to {request.url.path}")
 
-                # Decrypt
-                decrypted_data = decrypt_request(data)
+                # Replace request body with the decrypted plaintext (already serialised JSON)
+                request._body = decrypt_body(data["payload"])
 
                 # Log (with masking)
-                logger.debug(f"Decrypted request: {mask_sensitive_data(decrypted_data)}")
-
-                # Replace request body with decrypted data
-                request._body = json.dumps(decrypted_data).encode()
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Decrypted request: {mask_sensitive_data(json.loads(request._body))}")
 
                 # Add header to indicate encryption was used
                 request.headers.__dict__["_list"].append(
                     (b"x-encrypted", b"true")
                 )
+                return request
 
         except json.JSONDecodeError:
             # Not JSON, skip
             pass
-        except (DecryptionError, SignatureVerificationError):
+        except (ClientShedError, DecryptionError, SignatureVerificationError):
             # Re-raise encryption errors
             raise
         except Exception as e:
@@ -193,15 +611,23 @@ class EncryptionMiddleware(BaseHTTPMiddleware):
             # Don't fail on unexpected errors, pass through
             pass
 
+        # Pass the original body on to the route
+        request._body = bytes(body)
         return request
 
-    async def _encrypt_response(self, response: JSONResponse, path: str) -> JSONResponse:
+    async def _encrypt_response(self, response: Response, path: str, algorithm: Optional[str] = None) -> Response:
         """
         Encrypt response if needed
 
+        Routes with a field encryption spec get only the listed fields encrypted;
+        on other sensitive routes a JSON body is wrapped in an envelope as-is.
+        If field encryption fails the route answers 500: its marked fields are
+        never sent in plaintext.
+
         Args:
-            response: Response to encrypt
+            response: Response to encrypt (JSONResponse or the streamed response from call_next)
             path: Request path
+            algorithm: AEAD algorithm ID negotiated with the client
 
         Returns:
             Encrypted response or original response
@@ -209,51 +635,75 @@ class EncryptionMiddleware(BaseHTTPMiddleware):
         if not EncryptionConfig.ENCRYPTION_ENABLED:
             return response
 
+        # Get response body (call_next returns a streamed response)
+        body = await read_response_body(response)
+        field_spec = self.get_field_encryption_spec(path)
+
         try:
-            # Get response body
-            body = response.body
+            if body and field_spec:
+                # Encrypt only the marked fields
+                logger.info(f"Encrypting {len(field_spec)} field path(s) in response for {path}")
+                encrypted_data = encrypt_fields(json.loads(body), field_spec, algorithm)
+                encrypted_body = json.dumps(encrypted_data).encode()
+                mode = "fields"
 
-            if body:
-                # Parse JSON
-                data = json.loads(body)
+                # Log (with masking)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Encrypted response: {mask_sensitive_data(encrypted_data)}")
 
-                # Encrypt response
+            elif body and is_json_content_type(response.headers.get("content-type", "")):
+                # Encrypt the serialised body as-is (no parse/re-serialise round trip)
                 logger.info(f"Encrypting response for {path}")
-                encrypted_data = encrypt_response(data)
+                encrypted_body = encrypt_body(body, algorithm)
+                mode = "body"
 
-                # Log (with masking)
-                logger.debug(f"Encrypted response: {mask_sensitive_data(encrypted_data)}")
+            else:
+                encrypted_body = None
 
+            if encrypted_body is not None:
                 # Create new response with encrypted data
-                return JSONResponse(
-                    content=encrypted_data,
-                    status_code=response.status_code,
-                    headers=dict(response.headers)
-                )
+                encrypted_response = rebuild_response(response, encrypted_body)
+                encrypted_response.headers[ENCRYPTION_MODE_HEADER] = mode
+                if algorithm:
+                    encrypted_response.headers[ALGORITHM_HEADER] = algorithm
+                return encrypted_response
 
         except Exception as e:
+            if body and field_spec:
+                logger.error(f"Field encryption failed for {path}: {e}")
+                encryption_metrics.increment("encrypt.fields.failed")
+                return JSONResponse(
+                    status_code=500,
+                    content={
+                        "success": False,
+                        "error": {
+                            "message": "Internal server error",
+                            "code": "ENCRYPTION_FAILED"
+                        }
+                    }
+                )
             logger.error(f"Error encrypting response: {e}")
-            # Return original response on encryption failure (fail open)
+            # Return original response on whole-body encryption failure (fail open)
 
-        return response
+        return rebuild_response(response, body)
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """
     Middleware to add security headers to all responses
-    """
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+    The headers are encoded once at startup and appended to the raw header
+    list at http.response.start, so bodies (including streamed media) pass
+    through untouched. Headers the route already set are left alone.
+    """
 
-        # Add CSP header (adjust for your needs)
-        response.headers["Content-Security-Policy"] = (
+    # Add CSP header (adjust for your needs)
+    SECURITY_HEADERS = {
+        "X-Content-Type-Options": "nosniff",
+        "X-Frame-Options": "DENY",
+        "X-XSS-Protection": "1; mode=block",
+        "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+        "Content-Security-Policy": (
             "default-src 'self'; "
             "script-src 'self' https://www.googletagmanager.com; "
             "style-src 'self' 'unsafe-inline'; "
@@ -263,9 +713,241 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "frame-ancestors 'none'; "
             "base-uri 'self'; "
             "form-action 'self'"
-        )
+        ),
+    }
 
-        return response
+    def __init__(self, app, security_headers: Optional[Dict[str, str]] = None):
+        """
+        Initialize security headers middleware
+
+        Args:
+            app: ASGI application
+            security_headers: Headers to add instead of SECURITY_HEADERS
+        """
+        self.app = app
+
+        if security_headers:
+            self.SECURITY_HEADERS = security_headers
+
+        self.raw_headers = encode_headers(self.SECURITY_HEADERS)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = append_headers(message.get("headers", []), self.raw_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+def encode_headers(headers: Dict[str, Optional[str]]) -> RawHeaders:
+    """
+    Encode a header mapping as an ASGI raw header list (lower-cased latin-1 names)
+
+    Args:
+        headers: Header names to values (None values are skipped)
+
+    Returns:
+        List of (name, value) byte pairs
+    """
+    return [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in headers.items()
+        if value is not None
+    ]
+
+
+def append_headers(headers: RawHeaders, extra: RawHeaders) -> RawHeaders:
+    """
+    Append precomputed headers to a response's raw headers, skipping any the response already set
+
+    Args:
+        headers: Raw headers from http.response.start
+        extra: Precomputed raw headers to add
+
+    Returns:
+        New raw header list
+    """
+    existing = {name for name, _ in headers}
+    return list(headers) + [header for header in extra if header[0] not in existing]
+
+
+async def read_request_body(request: Request) -> Union[bytes, bytearray]:
+    """
+    Read a request body without holding both its chunks and a joined copy
+
+    A body that arrives in one chunk (most API requests) is returned as received.
+    Longer bodies are copied into a single buffer sized from Content-Length as
+    they stream, so peak memory stays at about one body instead of the chunk
+    list plus its join. The size limit is still enforced by limit_receive.
+
+    Args:
+        request: Incoming request (its stream must not have been read yet)
+
+    Returns:
+        Body as bytes (single chunk) or bytearray
+    """
+    if hasattr(request, "_body"):
+        return request._body
+
+    content_length = request.headers.get("content-length", "")
+    expected = int(content_length) if content_length.isdigit() else 0
+
+    first = b""
+    buffer: Optional[bytearray] = None
+    received = 0
+    async for chunk in request.stream():
+        if not chunk:
+            continue
+        if not first:
+            first = chunk
+            received = len(chunk)
+            continue
+        if buffer is None:
+            buffer = bytearray(max(expected, received))
+            buffer[:received] = first
+
+        end = received + len(chunk)
+        if end <= len(buffer):
+            buffer[received:end] = chunk  # Same-size slice assignment, no reallocation
+        else:
+            del buffer[received:]
+            buffer += chunk  # Body longer than Content-Length (or none was sent)
+        received = end
+
+    if buffer is None:
+        return first
+
+    del buffer[received:]
+    return buffer
+
+
+async def read_response_body(response: Response) -> bytes:
+    """
+    Get a response's body, draining the body iterator of streamed responses
+
+    Args:
+        response: Response returned by a route or call_next
+
+    Returns:
+        Complete body bytes
+    """
+    if hasattr(response, "body"):
+        return response.body
+
+    chunks = []
+    async for chunk in response.body_iterator:
+        chunks.append(chunk.encode() if isinstance(chunk, str) else bytes(chunk))
+    return b"".join(chunks)
+
+
+def rebuild_response(response: Response, body: bytes) -> Response:
+    """
+    Build a new response with a replaced body, keeping status and all headers
+    (including repeated ones such as Set-Cookie)
+
+    Args:
+        response: Original response
+        body: New body bytes
+
+    Returns:
+        Response with the new body and a matching Content-Length
+    """
+    rebuilt = Response(content=body, status_code=response.status_code)
+    rebuilt.raw_headers = [
+        (name, value) for name, value in response.raw_headers
+        if name != b"content-length"
+    ] + [(b"content-length", str(len(body)).encode())]
+    rebuilt.background = response.background
+    return rebuilt
+
+
+def _header_value(scope: Scope, name: bytes) -> Optional[str]:
+    """Get a raw request header from an ASGI scope without building a Request"""
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def not_modified_response(etag: str) -> Response:
+    """Build a 304 response for a matching conditional request"""
+    return Response(
+        status_code=304,
+        headers={"etag": etag, "cache-control": "private, no-cache"}
+    )
+
+
+def get_user_key(request: Request) -> str:
+    """
+    Identify the user for per-user caches without keeping their credentials
+
+    Args:
+        request: FastAPI Request object
+
+    Returns:
+        SHA-256 hex digest of the Authorization header, or of the Cookie header
+        for cookie-authenticated sessions
+    """
+    credentials = request.headers.get("authorization") or request.headers.get("cookie") or ""
+    return hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def has_credentials(request: Request) -> bool:
+    """Check if a request carries credentials that identify its user (Authorization or Cookie)"""
+    return bool(request.headers.get("authorization") or request.headers.get("cookie"))
+
+
+def is_cacheable_response(response: Response) -> bool:
+    """
+    Check if a handler's response may be stored in the per-user response cache
+
+    Responses that set cookies or opt out with Cache-Control: no-store are never cached.
+    """
+    if response.status_code != 200 or "set-cookie" in response.headers:
+        return False
+    return "no-store" not in response.headers.get("cache-control", "").lower()
+
+
+def invalidate_cached_responses(request: Request, *route_prefixes: str) -> None:
+    """
+    Drop the requesting user's cached responses and ETags
+
+    For handlers that change data behind a cached route other than through
+    its own write endpoints (writes to CACHED_ENDPOINTS and CACHE_INVALIDATIONS
+    are handled by the middleware). To drop every user's responses, call
+    response_cache.invalidate(None, route_prefix) instead.
+
+    Args:
+        request: Request of the user whose data changed
+        *route_prefixes: Cached route prefixes to drop (e.g. "/subscription")
+    """
+    user_key = get_user_key(request)
+    for route_prefix in route_prefixes:
+        digest_cache.invalidate(user_key, route_prefix)
+        response_cache.invalidate(user_key, route_prefix)
+
+
+def get_client_id(request: Request) -> str:
+    """
+    Identify the client for rate limiting
+
+    Args:
+        request: FastAPI Request object
+
+    Returns:
+        Client host. Behind a load balancer this is the balancer's address
+        (shared by every user) unless uvicorn trusts its X-Forwarded-For:
+        run with --proxy-headers --forwarded-allow-ips <balancer IPs>
+    """
+    return request.client.host if request.client else "unknown"
 
 
 # Utility function to check if request has encryption header
@@ -0,0 +1,248 @@
+"""
+Single-Pass Security Pipeline
+One ASGI layer for security headers, CORS and encryption routing, with header blocks precomputed at startup
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from starlette.types import Message, Receive, Scope, Send
+
+from app.middleware.encryption_middleware import (
+    ALGORITHM_HEADER,
+    BODY_METHODS,
+    ENCRYPTION_MODE_HEADER,
+    EncryptionMiddleware,
+    RawHeaders,
+    SecurityHeadersMiddleware,
+    append_headers,
+    encode_headers,
+)
+
+logger = logging.getLogger(__name__)
+
+# Route kinds (decided once per path, see SecurityPipelineMiddleware._route_plan)
+ROUTE_PASSTHROUGH = "passthrough"  # Streamed straight to the app (media)
+ROUTE_SENSITIVE = "sensitive"  # Responses encrypted (or writes invalidate cached responses)
+ROUTE_DEFAULT = "default"  # Encrypted request bodies decrypted, responses plain
+
+
+class SecurityPipelineMiddleware:
+    """
+    Security headers, CORS and encryption decisions in a single pass
+
+    Replaces stacking EncryptionMiddleware, SecurityHeadersMiddleware and
+    CORSMiddleware:
+    - Header blocks (security headers, per-route CSP, CORS) are encoded once
+      at startup and appended to the raw header list at http.response.start
+    - CORS preflights are answered here without reaching any other layer
+    - Each path is classified once (LRU-cached); only requests that can carry
+      an envelope or get an encrypted response go through EncryptionMiddleware,
+      everything else is sent straight to the app without buffering
+    """
+
+    # Per-route Content-Security-Policy overrides (longest matching prefix wins;
+    # None drops the CSP header for that route)
+    # Example: {"/api/docs": "default-src 'self'; script-src 'self' https://cdn.jsdelivr.net"}
+    CSP_OVERRIDES: Dict[str, Optional[str]] = {}
+
+    # CORS settings ("*" in CORS_ORIGINS allows any origin)
+    CORS_ORIGINS: List[str] = []
+    CORS_ALLOW_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+    CORS_ALLOW_HEADERS = ["*"]  # "*" echoes the headers the preflight asks for
+    CORS_EXPOSE_HEADERS = ["ETag", ENCRYPTION_MODE_HEADER, ALGORITHM_HEADER]
+    CORS_ALLOW_CREDENTIALS = True
+    CORS_MAX_AGE = 600  # Seconds browsers may cache a preflight result
+
+    # Paths whose route plan is kept in memory
+    ROUTE_CACHE_SIZE = 4096
+
+    def __init__(
+        self,
+        app,
+        security_headers: Optional[Dict[str, str]] = None,
+        csp_overrides: Optional[Dict[str, Optional[str]]] = None,
+        cors_origins: Optional[List[str]] = None,
+        cors_allow_methods: Optional[List[str]] = None,
+        cors_allow_headers: Optional[List[str]] = None,
+        cors_expose_headers: Optional[List[str]] = None,
+        cors_allow_credentials: Optional[bool] = None,
+        cors_max_age: Optional[int] = None,
+        **encryption_options: Any,
+    ):
+        """
+        Initialize security pipeline
+
+        Args:
+            app: ASGI application
+            security_headers: Headers added to every response (defaults to SecurityHeadersMiddleware's)
+            csp_overrides: Per-route Content-Security-Policy values
+            cors_origins: Origins allowed to make cross-origin requests
+            cors_allow_methods: Methods allowed in cross-origin requests
+            cors_allow_headers: Request headers allowed in cross-origin requests
+            cors_expose_headers: Response headers readable by cross-origin scripts
+            cors_allow_credentials: Allow cookies and Authorization on cross-origin requests
+            cors_max_age: Preflight cache lifetime in seconds
+            **encryption_options: Passed to EncryptionMiddleware (sensitive_endpoints,
+                public_endpoints, field_encryption_specs, ...)
+        """
+        self.app = app
+        self.encryption = EncryptionMiddleware(app, **encryption_options)
+
+        security_headers = security_headers or SecurityHeadersMiddleware.SECURITY_HEADERS
+
+        if csp_overrides:
+            self.CSP_OVERRIDES = csp_overrides
+
+        if cors_origins:
+            self.CORS_ORIGINS = cors_origins
+
+        if cors_allow_methods:
+            self.CORS_ALLOW_METHODS = cors_allow_methods
+
+        if cors_allow_headers:
+            self.CORS_ALLOW_HEADERS = cors_allow_headers
+
+        if cors_expose_headers:
+            self.CORS_EXPOSE_HEADERS = cors_expose_headers
+
+        if cors_allow_credentials is not None:
+            self.CORS_ALLOW_CREDENTIALS = cors_allow_credentials
+
+        if cors_max_age is not None:
+            self.CORS_MAX_AGE = cors_max_age
+
+        # Security header blocks: the default and one per CSP override (longest prefix first)
+        self.security_headers = encode_headers(security_headers)
+        self.route_security_headers: List[Tuple[str, RawHeaders]] = [
+            (prefix, encode_headers({**security_headers, "Content-Security-Policy": csp}))
+            for prefix, csp in sorted(self.CSP_OVERRIDES.items(), key=lambda item: len(item[0]), reverse=True)
+        ]
+
+        # CORS header blocks
+        self.allow_any_origin = "*" in self.CORS_ORIGINS
+        self.allowed_origins = frozenset(origin.encode("latin-1") for origin in self.CORS_ORIGINS)
+        self.allowed_methods = frozenset(method.encode("latin-1") for method in self.CORS_ALLOW_METHODS)
+        self.echo_request_headers = "*" in self.CORS_ALLOW_HEADERS
+
+        # Browsers reject "*" when credentials are allowed, so the request's origin is echoed instead
+        self.echo_origin = self.CORS_ALLOW_CREDENTIALS or not self.allow_any_origin
+
+        cors_headers = {"Vary": "Origin" if self.echo_origin else None}
+        if self.CORS_ALLOW_CREDENTIALS:
+            cors_headers["Access-Control-Allow-Credentials"] = "true"
+        self.cors_headers = encode_headers({
+            **cors_headers,
+            "Access-Control-Expose-Headers": ", ".join(self.CORS_EXPOSE_HEADERS) or None,
+        })
+        self.preflight_headers = encode_headers({
+            **cors_headers,
+            "Access-Control-Allow-Methods": ", ".join(self.CORS_ALLOW_METHODS),
+            "Access-Control-Allow-Headers": None if self.echo_request_headers else ", ".join(self.CORS_ALLOW_HEADERS),
+            "Access-Control-Max-Age": str(self.CORS_MAX_AGE),
+        })
+
+        self._route_plan = lru_cache(maxsize=self.ROUTE_CACHE_SIZE)(self._build_route_plan)
+
+        logger.info(
+            f"Security pipeline initialized ({len(self.CORS_ORIGINS)} CORS origins, "
+            f"{len(self.CSP_OVERRIDES)} CSP overrides)"
+        )
+
+    def _build_route_plan(self, path: str) -> Tuple[str, RawHeaders]:
+        """Classify a path and pick its security header block"""
+        if self.encryption.is_passthrough_endpoint(path):
+            kind = ROUTE_PASSTHROUGH
+        elif self.encryption.is_sensitive_endpoint(path) and not self.encryption.is_public_endpoint(path):
+            kind = ROUTE_SENSITIVE
+        elif self.encryption.get_invalidated_endpoints(path):
+            # Writes here drop cached responses, which EncryptionMiddleware does
+            kind = ROUTE_SENSITIVE
+        else:
+            kind = ROUTE_DEFAULT
+
+        for prefix, headers in self.route_security_headers:
+            if path.startswith(prefix):
+                return kind, headers
+        return kind, self.security_headers
+
+    def is_allowed_origin(self, origin: bytes) -> bool:
+        """Check if an Origin header value may make cross-origin requests"""
+        return self.allow_any_origin or origin in self.allowed_origins
+
+    def _allow_origin_header(self, origin: bytes) -> Tuple[bytes, bytes]:
+        return (b"access-control-allow-origin", origin if self.echo_origin else b"*")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        kind, security_headers = self._route_plan(scope["path"])
+        method = scope["method"]
+
+        # One scan of the request headers for everything CORS needs
+        origin = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if method == "OPTIONS" and origin is not None and request_method is not None:
+            await self._preflight(origin, request_method, request_headers, security_headers, send)
+            return
+
+        extra_headers = security_headers
+        cors_headers = None
+        if origin is not None and self.is_allowed_origin(origin):
+            cors_headers = self.cors_headers + [self._allow_origin_header(origin)]
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = append_headers(message.get("headers", []), extra_headers)
+                message["headers"] = headers + cors_headers if cors_headers else headers
+            await send(message)
+
+        # Only bodies that may carry an envelope and sensitive routes need the
+        # (buffering) encryption layer; everything else goes straight to the app
+        if kind == ROUTE_PASSTHROUGH or (kind == ROUTE_DEFAULT and method not in BODY_METHODS):
+            await self.app(scope, receive, send_with_headers)
+        else:
+            await self.encryption(scope, receive, send_with_headers)
+
+    async def _preflight(
+        self,
+        origin: bytes,
+        request_method: bytes,
+        request_headers: Optional[bytes],
+        security_headers: RawHeaders,
+        send: Send,
+    ) -> None:
+        """Answer a CORS preflight request without calling the app"""
+        failures = []
+        if not self.is_allowed_origin(origin):
+            failures.append("origin")
+        if request_method not in self.allowed_methods:
+            failures.append("method")
+
+        if failures:
+            status = 400
+            body = f"Disallowed CORS {', '.join(failures)}".encode()
+            headers = list(security_headers)
+        else:
+            status = 200
+            body = b"OK"
+            headers = security_headers + self.preflight_headers + [self._allow_origin_header(origin)]
+            if self.echo_request_headers and request_headers:
+                headers.append((b"access-control-allow-headers", request_headers))
+
+        headers += [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,62 @@
+"""
+Health and Readiness Routes
+Serve the readiness monitor's cached snapshot, so health-check polling does no work on a busy worker
+"""
+
+import hmac
+
+from fastapi import APIRouter, HTTPException, Request
+from starlette.responses import Response
+
+from app.utils.readiness import STALE_BODY, ReadinessConfig, readiness_monitor
+
+router = APIRouter()
+
+# Probes must never be answered from an HTTP cache
+NO_STORE = {"cache-control": "no-store"}
+
+
+def snapshot_response(ready_check: bool) -> Response:
+    """Build a response from the latest snapshot"""
+    snapshot = readiness_monitor.current()
+
+    if ready_check:
+        if readiness_monitor.is_stale(snapshot):
+            return Response(STALE_BODY, status_code=503, media_type="application/json", headers=NO_STORE)
+        body, ok = snapshot.ready_body, snapshot.ready
+    else:
+        body, ok = snapshot.health_body, snapshot.healthy
+
+    return Response(body, status_code=200 if ok else 503, media_type="application/json", headers=NO_STORE)
+
+
+@router.get("/health")
+async def health_check() -> Response:
+    """
+    Liveness: warm-up finished and the crypto self-test passes (503 otherwise)
+    The body carries the status, failing checks and default AEAD (measurements: /health/details)
+    """
+    return snapshot_response(ready_check=False)
+
+
+@router.get("/ready")
+async def readiness_check() -> Response:
+    """
+    Readiness: healthy and not saturated (event-loop lag, thread pool queue, DB pools)
+    Returns 503 with the failing checks in "reasons" so load balancers can drain the worker
+    """
+    return snapshot_response(ready_check=True)
+
+
+@router.get("/health/details")
+async def health_details(request: Request) -> Response:
+    """
+    Full snapshot for operators: pid, self-test timings, loop lag, thread pool, DB pools, metrics
+    Requires the X-Health-Token header to match API_HEALTH_DETAILS_TOKEN (404 when unset or wrong)
+    """
+    token = request.headers.get("x-health-token", "").encode()
+    if not ReadinessConfig.DETAILS_TOKEN or not hmac.compare_digest(token, ReadinessConfig.DETAILS_TOKEN.encode()):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    snapshot = readiness_monitor.current()
+    return Response(snapshot.details_body, media_type="application/json", headers=NO_STORE)
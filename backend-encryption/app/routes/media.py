@@ -0,0 +1,326 @@
+"""
+Local Media Streaming Routes
+Serves meditation audio/video with HTTP Range (206) support, reading files off the event loop
+"""
+
+import logging
+import mimetypes
+import os
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.utils.etag import etag_matches
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Inclusive (start, end) byte offsets
+ByteRange = Tuple[int, int]
+
+
+class MediaConfig:
+    """Configuration for local media streaming"""
+
+    # Directory that media files are served from (e.g. the files copy-media-files.sh copies)
+    MEDIA_ROOT = os.getenv("MEDIA_ROOT", "./media")
+
+    # Prefix the router is mounted under (middleware passes these responses through untouched)
+    ROUTE_PREFIX = "/api/media"
+
+    # Bytes read (in a worker thread) per body message
+    CHUNK_SIZE = 256 * 1024  # 256 KB
+
+    # Maximum number of ranges honoured in one request (guards against range amplification)
+    MAX_RANGES = 16
+
+    # Cache-Control max-age for media files
+    CACHE_MAX_AGE = 24 * 60 * 60  # 1 day in seconds
+
+
+class RangeNotSatisfiableError(Exception):
+    """Exception raised when none of the requested ranges overlap the file"""
+    pass
+
+
+def resolve_media_path(file_path: str) -> Optional[str]:
+    """
+    Resolve a request path to a file inside MEDIA_ROOT
+
+    Args:
+        file_path: Path relative to the media root
+
+    Returns:
+        Absolute file path, or None if it escapes the media root or is not a file
+    """
+    root = os.path.realpath(MediaConfig.MEDIA_ROOT)
+    full_path = os.path.realpath(os.path.join(root, file_path))
+
+    if os.path.commonpath([root, full_path]) != root:
+        return None
+
+    if not os.path.isfile(full_path):
+        return None
+
+    return full_path
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """
+    Build a strong ETag from file modification time and size
+
+    Args:
+        stat_result: Result of os.stat for the file
+
+    Returns:
+        Quoted ETag value
+    """
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[ByteRange]]:
+    """
+    Parse an HTTP Range header into sorted, coalesced byte ranges
+
+    Args:
+        range_header: Value of the Range header (e.g. "bytes=0-99,200-")
+        file_size: Size of the file in bytes
+
+    Returns:
+        List of inclusive (start, end) ranges, or None if the header should be
+        ignored (malformed, unknown unit or too many ranges)
+
+    Raises:
+        RangeNotSatisfiableError: If no range overlaps the file
+    """
+    unit, _, range_spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not range_spec:
+        return None
+
+    ranges: List[ByteRange] = []
+    for part in range_spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+
+        start_str, sep, end_str = part.partition("-")
+        if not sep:
+            return None
+
+        try:
+            if start_str:
+                start = int(start_str)
+                end = int(end_str) if end_str else max(start, file_size - 1)
+                if start > end:
+                    return None
+            else:
+                # Suffix range: last N bytes
+                suffix_length = int(end_str)
+                if suffix_length <= 0:
+                    continue
+                start = max(file_size - suffix_length, 0)
+                end = file_size - 1
+        except ValueError:
+            return None
+
+        if start >= file_size:
+            continue
+
+        ranges.append((start, min(end, file_size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiableError(f"No satisfiable range in {range_header!r}")
+
+    # Coalesce overlapping/adjacent ranges
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > MediaConfig.MAX_RANGES:
+        return None
+
+    return merged
+
+
+def _if_range_allows(if_range: str, etag: str, last_modified: float) -> bool:
+    """Check whether an If-Range validator still matches the file"""
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # If-Range requires strong comparison
+        return if_range == etag
+
+    try:
+        return int(parsedate_to_datetime(if_range).timestamp()) == int(last_modified)
+    except (TypeError, ValueError):
+        return False
+
+
+class MediaFileResponse(Response):
+    """
+    File response that serves full files, single ranges and multi-range
+    (multipart/byteranges) bodies
+
+    The body is read in CHUNK_SIZE os.pread / read calls in a worker thread, so
+    cold files (disk reads) never block the event loop. uvicorn exposes no socket
+    to ASGI apps, so os.sendfile is not available here.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        ranges: Optional[List[ByteRange]] = None,
+        media_type: Optional[str] = None,
+        headers: Optional[dict] = None,
+        send_body: bool = True,
+    ):
+        self.path = path
+        self.file_size = stat_result.st_size
+        self.ranges = ranges
+        self.send_body = send_body
+        self.background = None
+        self.status_code = 206 if ranges else 200
+        self.media_type = media_type or "application/octet-stream"
+
+        self._parts: List[Tuple[bytes, ByteRange]] = []
+        self._closing_boundary = b""
+
+        if ranges and len(ranges) > 1:
+            boundary = secrets.token_hex(16)
+            content_length = 0
+            for index, (start, end) in enumerate(ranges):
+                # Every part after the first starts with the CRLF that ends the previous one
+                separator = "" if index == 0 else "\r\n"
+                part_header = (
+                    f"{separator}--{boundary}\r\n"
+                    f"Content-Type: {self.media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+                ).encode("latin-1")
+                self._parts.append((part_header, (start, end)))
+                content_length += len(part_header) + (end - start + 1)
+            self._closing_boundary = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            content_length += len(self._closing_boundary)
+            content_type = f"multipart/byteranges; boundary={boundary}"
+        elif ranges:
+            start, end = ranges[0]
+            self._parts.append((b"", (start, end)))
+            content_length = end - start + 1
+            content_type = self.media_type
+        else:
+            self._parts.append((b"", (0, self.file_size - 1)))
+            content_length = self.file_size
+            content_type = self.media_type
+
+        self.init_headers(headers)
+        self.headers["content-type"] = content_type
+        self.headers["content-length"] = str(content_length)
+        if ranges and len(ranges) == 1:
+            start, end = ranges[0]
+            self.headers["content-range"] = f"bytes {start}-{end}/{self.file_size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if not self.send_body or self.file_size == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await self._send_chunked(file, send)
+        finally:
+            file.close()
+
+    async def _send_chunked(self, file, send: Send) -> None:
+        """Send each range in chunks read in a worker thread"""
+        for part_header, (start, end) in self._parts:
+            if part_header:
+                await send({"type": "http.response.body", "body": part_header, "more_body": True})
+
+            offset = start
+            while offset <= end:
+                length = min(MediaConfig.CHUNK_SIZE, end - offset + 1)
+                chunk = await anyio.to_thread.run_sync(_read_chunk, file, offset, length)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        await send({"type": "http.response.body", "body": self._closing_boundary, "more_body": False})
+
+
+def _read_chunk(file, offset: int, length: int) -> bytes:
+    """Read a chunk at an absolute offset (pread where available)"""
+    if hasattr(os, "pread"):
+        return os.pread(file.fileno(), length, offset)
+    file.seek(offset)
+    return file.read(length)
+
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+async def stream_media(file_path: str, request: Request) -> Response:
+    """
+    Stream a media file with Range / If-Range / ETag support
+
+    Args:
+        file_path: Path of the file relative to MEDIA_ROOT
+        request: Incoming request
+
+    Returns:
+        200 full file, 206 partial content, 304 not modified or 416 range not satisfiable
+    """
+    # Path resolution and stat hit the disk; keep them off the event loop
+    full_path = await anyio.to_thread.run_sync(resolve_media_path, file_path)
+    if full_path is None:
+        raise HTTPException(status_code=404, detail="Media file not found")
+
+    stat_result = await anyio.to_thread.run_sync(os.stat, full_path)
+    etag = make_etag(stat_result)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    media_type = mimetypes.guess_type(full_path)[0]
+
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": last_modified,
+        "cache-control": f"public, max-age={MediaConfig.CACHE_MAX_AGE}",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    ranges = None
+    range_header = request.headers.get("range")
+    if range_header:
+        if_range = request.headers.get("if-range")
+        if not if_range or _if_range_allows(if_range, etag, stat_result.st_mtime):
+            try:
+                ranges = parse_range_header(range_header, stat_result.st_size)
+            except RangeNotSatisfiableError:
+                headers["content-range"] = f"bytes */{stat_result.st_size}"
+                return Response(status_code=416, headers=headers)
+
+    return MediaFileResponse(
+        full_path,
+        stat_result,
+        ranges=ranges,
+        media_type=media_type,
+        headers=headers,
+        send_body=request.method != "HEAD",
+    )
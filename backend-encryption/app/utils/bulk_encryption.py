@@ -0,0 +1,343 @@
+"""
+Offline Bulk Encryption CLI
+Encrypts, decrypts or re-keys JSON Lines files in parallel for exports and data migrations
+
+Usage (from backend-encryption/):
+    python -m app.utils.bulk_encryption encrypt --input users.jsonl --output users.enc.jsonl
+    python -m app.utils.bulk_encryption decrypt --input users.enc.jsonl --output users.jsonl
+    API_NEW_ENCRYPTION_KEY=... API_NEW_HMAC_KEY=... \\
+        python -m app.utils.bulk_encryption reencrypt --input old.jsonl --output new.jsonl \\
+        --checkpoint migrate.ckpt --workers 8
+
+Keys are read from the environment (API_ENCRYPTION_KEY / API_HMAC_KEY, and
+API_NEW_ENCRYPTION_KEY / API_NEW_HMAC_KEY for re-encryption), never from argv.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.utils.encryption import (
+    EncryptionConfig,
+    decrypt_data,
+    encrypt_data,
+)
+
+logger = logging.getLogger(__name__)
+
+MODES = ("encrypt", "decrypt", "reencrypt")
+
+# (line number, raw line) / (line number, output line or None, error or None)
+InputRecord = Tuple[int, bytes]
+OutputRecord = Tuple[int, Optional[bytes], Optional[str]]
+
+# Per-process worker settings, set once by _init_worker
+_worker_state: Dict[str, Any] = {}
+
+
+@contextmanager
+def use_keys(encryption_key: str, hmac_key: str) -> Iterator[None]:
+    """
+    Temporarily switch the process-wide encryption and HMAC keys
+
+    Only safe in single-threaded processes such as the pool workers below.
+
+    Args:
+        encryption_key: Encryption passphrase
+        hmac_key: HMAC signing key
+    """
+    previous = (EncryptionConfig.ENCRYPTION_KEY, EncryptionConfig.HMAC_KEY)
+    EncryptionConfig.ENCRYPTION_KEY, EncryptionConfig.HMAC_KEY = encryption_key, hmac_key
+    try:
+        yield
+    finally:
+        EncryptionConfig.ENCRYPTION_KEY, EncryptionConfig.HMAC_KEY = previous
+
+
+def _unwrap_envelope(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Accept both {"encrypted": true, "payload": {...}} and bare payloads"""
+    if record.get("encrypted") is True and isinstance(record.get("payload"), dict):
+        return record["payload"]
+    return record
+
+
+def _init_worker(mode: str, keys: Tuple[str, str], new_keys: Optional[Tuple[str, str]], algorithm: Optional[str]) -> None:
+    _worker_state.update(mode=mode, keys=keys, new_keys=new_keys, algorithm=algorithm)
+
+
+def _process_record(line: bytes) -> bytes:
+    """Encrypt, decrypt or re-encrypt one JSON line"""
+    mode = _worker_state["mode"]
+    record = json.loads(line)
+
+    if mode == "encrypt":
+        with use_keys(*_worker_state["keys"]):
+            result = encrypt_data(record, _worker_state["algorithm"])
+    else:
+        with use_keys(*_worker_state["keys"]):
+            # Stored data is older than MAX_REQUEST_AGE by design
+            result = decrypt_data(_unwrap_envelope(record), check_timestamp=False)
+
+        if mode == "reencrypt":
+            with use_keys(*_worker_state["new_keys"]):
+                result = encrypt_data(result, _worker_state["algorithm"])
+
+    return json.dumps(result, separators=(",", ":")).encode() + b"\n"
+
+
+def _process_chunk(chunk: List[InputRecord]) -> List[OutputRecord]:
+    """Process a chunk of lines, capturing per-record errors"""
+    results = []
+    for line_number, line in chunk:
+        try:
+            results.append((line_number, _process_record(line), None))
+        except Exception as e:
+            results.append((line_number, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def _read_batch(input_file, batch_size: int, chunk_size: int, first_line: int) -> Tuple[List[List[InputRecord]], int]:
+    """Read up to batch_size non-empty lines, split into chunks for the pool"""
+    chunks: List[List[InputRecord]] = []
+    chunk: List[InputRecord] = []
+    line_number = first_line
+    count = 0
+
+    while count < batch_size:
+        line = input_file.readline()
+        if not line:
+            break
+        line_number += 1
+        if not line.strip():
+            continue
+
+        chunk.append((line_number, line))
+        count += 1
+        if len(chunk) == chunk_size:
+            chunks.append(chunk)
+            chunk = []
+
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks, line_number
+
+
+def load_checkpoint(path: Optional[str]) -> Dict[str, int]:
+    """
+    Load a checkpoint written by a previous interrupted run
+
+    Args:
+        path: Checkpoint file path (may be None)
+
+    Returns:
+        Checkpoint offsets and counters (all zero when starting fresh)
+    """
+    checkpoint = {
+        "input_offset": 0, "output_offset": 0, "errors_offset": 0, "line_number": 0, "records": 0, "errors": 0,
+    }
+    if path and os.path.exists(path):
+        with open(path) as f:
+            checkpoint.update(json.load(f))
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, int]) -> None:
+    """Atomically write a checkpoint (write to a temp file, then rename)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def run(
+    mode: str,
+    input_path: str,
+    output_path: str,
+    workers: int = 0,
+    ordered: bool = True,
+    chunk_size: int = 256,
+    batch_size: int = 16384,
+    checkpoint_path: Optional[str] = None,
+    errors_path: Optional[str] = None,
+    new_keys: Optional[Tuple[str, str]] = None,
+    algorithm: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Process a JSON Lines file with a process pool
+
+    Input is read in bounded batches so memory stays flat on multi-GB files.
+    Each batch is split into chunks that workers process independently;
+    output order within a batch follows the input unless ordered is False.
+    After every batch the output is fsynced and a checkpoint with the input,
+    output and errors file offsets is written, so an interrupted run resumes
+    from the last batch; a fresh run truncates both output files.
+
+    Args:
+        mode: "encrypt", "decrypt" or "reencrypt"
+        input_path: JSON Lines input file
+        output_path: JSON Lines output file
+        workers: Worker processes (0 = one per CPU, 1 = run in-process)
+        ordered: Keep output in input order
+        chunk_size: Records per worker task
+        batch_size: Records read per checkpointed batch
+        checkpoint_path: Checkpoint file; an existing one resumes the run
+        errors_path: JSON Lines file for records that failed (line number and error)
+        new_keys: (encryption key, HMAC key) to re-encrypt with
+        algorithm: AEAD algorithm ID for encrypted output
+
+    Returns:
+        Summary with records, errors, elapsed seconds and records per second
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    if mode == "reencrypt" and not new_keys:
+        raise ValueError("reencrypt requires new keys")
+
+    workers = workers or os.cpu_count() or 1
+    keys = (EncryptionConfig.ENCRYPTION_KEY, EncryptionConfig.HMAC_KEY)
+    init_args = (mode, keys, new_keys, algorithm)
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint["input_offset"]:
+        logger.info(f"Resuming from line {checkpoint['line_number']} ({checkpoint['records']} records done)")
+
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=init_args) if workers > 1 else None
+    if pool is None:
+        _init_worker(*init_args)
+
+    start = time.perf_counter()
+    processed = 0
+
+    try:
+        with open(input_path, "rb") as input_file, \
+                open(output_path, "r+b" if checkpoint["output_offset"] else "wb") as output_file, \
+                open(errors_path, "r+b" if checkpoint["errors_offset"] else "wb") if errors_path \
+                else open(os.devnull, "wb") as errors_file:
+            # Drop anything written after the last checkpoint
+            input_file.seek(checkpoint["input_offset"])
+            output_file.seek(checkpoint["output_offset"])
+            output_file.truncate()
+            if errors_path:
+                errors_file.seek(checkpoint["errors_offset"])
+                errors_file.truncate()
+
+            while True:
+                chunks, last_line = _read_batch(input_file, batch_size, chunk_size, checkpoint["line_number"])
+                if not chunks:
+                    break
+
+                if pool is None:
+                    results = map(_process_chunk, chunks)
+                elif ordered:
+                    results = pool.imap(_process_chunk, chunks)
+                else:
+                    results = pool.imap_unordered(_process_chunk, chunks)
+
+                for chunk_results in results:
+                    for line_number, output, error in chunk_results:
+                        if error is None:
+                            output_file.write(output)
+                            checkpoint["records"] += 1
+                        else:
+                            errors_file.write(json.dumps({"line": line_number, "error": error}).encode() + b"\n")
+                            checkpoint["errors"] += 1
+                        processed += 1
+
+                output_file.flush()
+                os.fsync(output_file.fileno())
+                errors_file.flush()
+                if errors_path:
+                    os.fsync(errors_file.fileno())
+
+                checkpoint.update(
+                    input_offset=input_file.tell(),
+                    output_offset=output_file.tell(),
+                    errors_offset=errors_file.tell() if errors_path else 0,
+                    line_number=last_line,
+                )
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, checkpoint)
+
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"{checkpoint['records']} records, {checkpoint['errors']} errors, "
+                    f"{processed / elapsed:.0f} records/s"
+                )
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "records": checkpoint["records"],
+        "errors": checkpoint["errors"],
+        "elapsed": round(elapsed, 3),
+        "records_per_second": round(processed / elapsed, 1) if elapsed else 0.0,
+        "workers": workers,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.utils.bulk_encryption",
+        description="Encrypt, decrypt or re-encrypt JSON Lines files in parallel",
+    )
+    parser.add_argument("mode", choices=MODES)
+    parser.add_argument("--input", required=True, help="JSON Lines input file")
+    parser.add_argument("--output", required=True, help="JSON Lines output file")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--unordered", action="store_true", help="Write results as they finish (faster, order not kept)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Records per worker task")
+    parser.add_argument("--batch-size", type=int, default=16384, help="Records per checkpointed batch")
+    parser.add_argument("--checkpoint", help="Checkpoint file; an existing one resumes the run")
+    parser.add_argument("--errors", help="JSON Lines file for records that failed")
+    parser.add_argument("--algorithm", help="AEAD algorithm for encrypted output (default: AES-GCM)")
+    parser.add_argument("--new-encryption-key-env", default="API_NEW_ENCRYPTION_KEY",
+                        help="Environment variable holding the new encryption key (reencrypt)")
+    parser.add_argument("--new-hmac-key-env", default="API_NEW_HMAC_KEY",
+                        help="Environment variable holding the new HMAC key (reencrypt)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", stream=sys.stderr)
+
+    new_keys = None
+    if args.mode == "reencrypt":
+        new_encryption_key = os.getenv(args.new_encryption_key_env)
+        new_hmac_key = os.getenv(args.new_hmac_key_env)
+        if not new_encryption_key or not new_hmac_key:
+            parser.error(f"reencrypt needs {args.new_encryption_key_env} and {args.new_hmac_key_env} set")
+        new_keys = (new_encryption_key, new_hmac_key)
+
+    summary = run(
+        args.mode,
+        args.input,
+        args.output,
+        workers=args.workers,
+        ordered=not args.unordered,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint,
+        errors_path=args.errors,
+        new_keys=new_keys,
+        algorithm=args.algorithm,
+    )
+
+    logger.info(
+        f"Done: {summary['records']} records, {summary['errors']} errors in {summary['elapsed']}s "
+        f"({summary['records_per_second']} records/s, {summary['workers']} workers)"
+    )
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
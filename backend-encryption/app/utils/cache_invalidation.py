@@ -0,0 +1,125 @@
+"""
+Cache Invalidation Shared by All Workers
+Latest invalidation time per (user, route scope), checked by the ETag and response caches before they answer without running the handler
+"""
+
+import logging
+import time
+from typing import Optional
+
+from app.utils.encryption import EncryptionConfig
+from app.utils.shared_state import InvalidationTable, open_table
+
+logger = logging.getLogger(__name__)
+
+# User key recorded for invalidations that apply to every user
+ALL_USERS = "*"
+
+
+def invalidation_scope(route: str) -> str:
+    """
+    Get the scope invalidations are tracked under: the route's first path segment
+
+    Invalidating "/user/settings" therefore also drops cached "/user/..."
+    routes; coarser than the prefix, never finer.
+
+    Args:
+        route: Request path (and query string) or route prefix
+
+    Returns:
+        Scope, e.g. "/profile"
+
+    Raises:
+        ValueError: If the route has no first path segment (e.g. "/")
+    """
+    segment = route.lstrip("/").split("?", 1)[0].split("/", 1)[0]
+    if not segment:
+        raise ValueError(f"Route prefix {route!r} must name at least one path segment")
+    return "/" + segment
+
+
+class CacheInvalidations:
+    """
+    Invalidation times per (user, route scope), shared by the workers on a host
+
+    Each worker keeps its own caches, so dropping entries locally is not
+    enough: the other workers would keep answering from theirs. Callers take
+    `generation()` before running the handler, store it with the entry and
+    only serve the entry while `is_fresh` says neither the user nor all users
+    had the route's scope invalidated since.
+
+    Without shared state (SHARED_STATE_NAME empty) that only holds in a single
+    worker, so with WORKERS > 1 `enabled` is False and callers must always
+    run the handler.
+    """
+
+    def __init__(self, table: InvalidationTable, workers: int = 1):
+        """
+        Initialize invalidations
+
+        Args:
+            table: Invalidation times (shared, or process-local for a single worker)
+            workers: Number of worker processes serving the app
+        """
+        self.table = table
+        self.enabled = table.is_shared or workers <= 1
+
+    @property
+    def lifetime(self) -> float:
+        """Seconds an invalidation is remembered: the longest an entry may be served"""
+        return self.table.lifetime_ns / 1e9
+
+    @staticmethod
+    def generation() -> int:
+        """Current generation (wall-clock ns), taken before reading the data to cache"""
+        return time.time_ns()
+
+    def invalidate(self, user_key: Optional[str], route_prefix: str) -> None:
+        """
+        Invalidate a user's cached entries under a route prefix in every worker
+
+        Args:
+            user_key: Opaque user identifier, or None for all users
+            route_prefix: Route prefix that was modified (e.g. "/profile")
+        """
+        scope = invalidation_scope(route_prefix)
+        self.table.invalidate(f"{user_key or ALL_USERS}\0{scope}".encode())
+
+    def is_fresh(self, route: str, user_key: str, generation: int) -> bool:
+        """
+        Check that an entry read at `generation` has not been invalidated since
+
+        Args:
+            route: Cached request path (and query string)
+            user_key: Opaque user identifier
+            generation: Value of generation() taken before the entry's data was read
+        """
+        scope = invalidation_scope(route)
+        return all(
+            self.table.invalidated_at(f"{key}\0{scope}".encode()) < generation
+            for key in (user_key, ALL_USERS)
+        )
+
+
+def _open_invalidations() -> CacheInvalidations:
+    """Open the invalidation table (shared when SHARED_STATE_NAME is set)"""
+    name = EncryptionConfig.SHARED_STATE_NAME
+    table = open_table(
+        InvalidationTable,
+        f"{name}-invalidations" if name else None,
+        slots=EncryptionConfig.CACHE_INVALIDATION_SLOTS,
+        # Longest time a cached entry may be served after its data was read
+        lifetime=max(EncryptionConfig.ETAG_CACHE_TTL, EncryptionConfig.RESPONSE_CACHE_TTL),
+    )
+    invalidations = CacheInvalidations(table, EncryptionConfig.WORKERS)
+    if not invalidations.enabled:
+        logger.warning(
+            f"ETag and response caches answer only after running the handler: "
+            f"{EncryptionConfig.WORKERS} workers without a shared invalidation table "
+            f"(set API_SHARED_STATE_NAME)"
+        )
+    return invalidations
+
+
+# Shared by the ETag digest cache and the response cache
+cache_invalidations = _open_invalidations()
@@ -0,0 +1,147 @@
+"""
+AEAD Cipher Registry
+Maps envelope algorithm IDs to `cryptography` AEAD implementations (AES-GCM, ChaCha20-Poly1305, AES-GCM-SIV)
+"""
+
+import importlib
+import os
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+
+# Module holding the AEAD classes (imported on first use, not at startup)
+AEAD_MODULE = "cryptography.hazmat.primitives.ciphers.aead"
+
+# Algorithm ID used when an envelope has no "alg" field (what the browser client speaks)
+LEGACY_ALGORITHM = "AES-GCM"
+
+# Envelope algorithm IDs -> AEAD class names in AEAD_MODULE
+# All take a 256-bit key, a 96-bit nonce and produce a 128-bit tag
+AEAD_ALGORITHMS = {
+    "AES-GCM": "AESGCM",
+    "CHACHA20-POLY1305": "ChaCha20Poly1305",
+    "AES-GCM-SIV": "AESGCMSIV",  # Nonce-misuse resistant; needs OpenSSL 3.2+
+}
+
+
+class UnsupportedAlgorithmError(Exception):
+    """Exception raised when an algorithm ID is unknown or unavailable on this host"""
+    pass
+
+
+def get_aead_class(algorithm_id: str):
+    """Import and return the AEAD class for an algorithm ID"""
+    return getattr(importlib.import_module(AEAD_MODULE), AEAD_ALGORITHMS[algorithm_id])
+
+
+@lru_cache(maxsize=1)
+def get_supported_algorithms() -> List[str]:
+    """
+    Probe which AEAD algorithms the linked OpenSSL supports
+
+    Returns:
+        Algorithm IDs that can be used on this host, in registry order
+    """
+    from cryptography.exceptions import UnsupportedAlgorithm
+
+    supported = []
+    for algorithm_id in AEAD_ALGORITHMS:
+        try:
+            get_aead_class(algorithm_id)(os.urandom(32))
+        except (UnsupportedAlgorithm, AttributeError):
+            continue
+        supported.append(algorithm_id)
+    return supported
+
+
+def is_supported_algorithm(algorithm_id: str) -> bool:
+    """Check if an algorithm ID is known and available on this host"""
+    return algorithm_id in get_supported_algorithms()
+
+
+@lru_cache(maxsize=64)
+def create_aead(algorithm_id: str, key: bytes):
+    """
+    Create an AEAD cipher object (cached per algorithm and key, so the key
+    schedule is set up once and reused across messages)
+
+    Args:
+        algorithm_id: Envelope algorithm ID (e.g. "AES-GCM")
+        key: 256-bit key
+
+    Returns:
+        AEAD instance with encrypt(nonce, data, aad) / decrypt(nonce, data, aad)
+
+    Raises:
+        UnsupportedAlgorithmError: If the algorithm is unknown or unavailable
+    """
+    if not is_supported_algorithm(algorithm_id):
+        raise UnsupportedAlgorithmError(f"Unsupported algorithm: {algorithm_id}")
+    return get_aead_class(algorithm_id)(key)
+
+
+def negotiate_algorithm(header_value: Optional[str], preferred: str) -> str:
+    """
+    Pick the response algorithm from a client's X-Encryption-Algorithm header
+
+    The header is a comma-separated list of algorithm IDs the client can decrypt.
+    The host's preferred algorithm wins if the client offers it; otherwise the
+    first supported algorithm in the client's order is used. Clients that send
+    no header get LEGACY_ALGORITHM.
+
+    Args:
+        header_value: Raw header value (may be None)
+        preferred: Host default algorithm
+
+    Returns:
+        Algorithm ID to encrypt the response with
+    """
+    if not header_value:
+        return LEGACY_ALGORITHM
+
+    offered = [
+        algorithm_id.strip().upper()
+        for algorithm_id in header_value.split(",")
+        if algorithm_id.strip()
+    ]
+    if preferred in offered:
+        return preferred
+
+    for algorithm_id in offered:
+        if is_supported_algorithm(algorithm_id):
+            return algorithm_id
+
+    return LEGACY_ALGORITHM
+
+
+def benchmark_algorithms(payload_size: int = 4096, iterations: int = 200) -> Dict[str, float]:
+    """
+    Measure encrypt+decrypt throughput of each supported algorithm
+
+    Args:
+        payload_size: Plaintext size in bytes (typical API response)
+        iterations: Encrypt/decrypt round trips per algorithm
+
+    Returns:
+        Dictionary of algorithm ID to throughput in MB/s
+    """
+    key = os.urandom(32)
+    nonce = os.urandom(12)
+    plaintext = os.urandom(payload_size)
+    results = {}
+
+    for algorithm_id in get_supported_algorithms():
+        aead = get_aead_class(algorithm_id)(key)
+
+        # Warm up (first call pays for lazy OpenSSL initialisation)
+        aead.decrypt(nonce, aead.encrypt(nonce, plaintext, None), None)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            aead.decrypt(nonce, aead.encrypt(nonce, plaintext, None), None)
+        elapsed = time.perf_counter() - start
+
+        results[algorithm_id] = round(payload_size * iterations / elapsed / (1024 * 1024), 1)
+
+    return results
@@ -4,23 +4,41 @@ Matches the frontend encryption implementation (AES-256-GCM + HMAC-SHA256)
 """
 
 import base64
+import binascii
 import json
 import hmac
 import hashlib
+import threading
 import time
-from typing import Dict, Any, Optional, Tuple
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2
-from cryptography.hazmat.backends import default_backend
+from functools import lru_cache
+from typing import Dict, Any, NamedTuple, Optional, Tuple
+import logging
 import os
+import sys
+
+from app.utils.ciphers import (
+    LEGACY_ALGORITHM,
+    benchmark_algorithms,
+    create_aead,
+    get_supported_algorithms,
+    is_supported_algorithm,
+)
+from app.utils.metrics import encryption_metrics
+from app.utils.nonce import DEFAULT_MESSAGE_LIMIT, NonceExhaustedError, NonceGenerator
+from app.utils.shared_state import ReplayCache, open_table
+
+logger = logging.getLogger(__name__)
 
 
 class EncryptionConfig:
     """Configuration for API encryption"""
 
     # Algorithm settings
-    ALGORITHM = "AES-GCM"
+    # Host-preferred AEAD for clients that negotiate one (see app.utils.ciphers);
+    # replaced by the fastest supported algorithm at startup unless pinned here
+    ALGORITHM = os.getenv("API_ENCRYPTION_ALGORITHM", LEGACY_ALGORITHM).upper()
+    ALGORITHM_PINNED = "API_ENCRYPTION_ALGORITHM" in os.environ
+    ALGORITHM_BENCHMARK: Dict[str, float] = {}
     KEY_SIZE = 32  # 256 bits
     IV_SIZE = 12  # 96 bits for GCM
     TAG_SIZE = 16  # 128 bits
@@ -31,6 +49,55 @@ class EncryptionConfig:
 
     # Security settings
     MAX_REQUEST_AGE = 5 * 60 * 1000  # 5 minutes in milliseconds
+    MAX_CLOCK_SKEW = 30 * 1000  # 30 seconds in milliseconds (timestamps from the future)
+    MAX_BODY_SIZE = int(os.getenv("API_MAX_BODY_SIZE", str(1024 * 1024)))  # 1 MB default
+
+    # Decryption failure limiter (per client token bucket)
+    DECRYPTION_FAILURE_BURST = int(os.getenv("API_DECRYPTION_FAILURE_BURST", "10"))
+    DECRYPTION_FAILURE_REFILL_PER_SECOND = float(os.getenv("API_DECRYPTION_FAILURE_REFILL_PER_SECOND", "0.2"))
+
+    # ETag cache for encrypted responses: entries per (route, user) and the
+    # seconds a cached ETag may answer If-None-Match without running the handler
+    ETAG_CACHE_SIZE = int(os.getenv("API_ETAG_CACHE_SIZE", "4096"))
+    ETAG_CACHE_TTL = float(os.getenv("API_ETAG_CACHE_TTL", "30"))
+
+    # Plaintext response cache for GETs on cached sensitive routes: entries per
+    # (route, user), total bytes kept and seconds an entry may be served (0 disables).
+    # Hits skip the handler's auth checks, so the TTL bounds how long a revoked
+    # token can keep reading them
+    RESPONSE_CACHE_SIZE = int(os.getenv("API_RESPONSE_CACHE_SIZE", "4096"))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("API_RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    RESPONSE_CACHE_TTL = float(os.getenv("API_RESPONSE_CACHE_TTL", "10"))
+
+    # Messages encrypted under one process message key before it is rolled over
+    NONCE_MESSAGE_LIMIT = int(os.getenv("API_NONCE_MESSAGE_LIMIT", str(DEFAULT_MESSAGE_LIMIT)))
+
+    # Host-wide state shared by all workers (replay IDs, decryption-failure
+    # buckets) in shared memory segments named "<name>-<table>". Empty (the
+    # default) keeps it per worker, which is logged as a warning with WORKERS > 1;
+    # set a name unique to the deployment, since every process using the same
+    # name shares the tables. Segments outlive the workers: see
+    # app.utils.shared_state for removing them
+    SHARED_STATE_NAME = os.getenv("API_SHARED_STATE_NAME", "")
+
+    # Reject envelopes whose signature was already accepted within MAX_REQUEST_AGE,
+    # and the number of envelope IDs remembered (size for peak requests per window)
+    REPLAY_PROTECTION = os.getenv("API_REPLAY_PROTECTION", "true").lower() == "true"
+    REPLAY_CACHE_SLOTS = int(os.getenv("API_REPLAY_CACHE_SLOTS", "524288"))
+
+    # Clients tracked by the decryption failure limiter
+    DECRYPTION_FAILURE_SLOTS = int(os.getenv("API_DECRYPTION_FAILURE_SLOTS", "65536"))
+
+    # Worker processes serving the app (uvicorn / gunicorn --workers). With more
+    # than one, the caches that answer without running the handler (ETag 304s,
+    # cached responses) need SHARED_STATE_NAME so every worker sees invalidations
+    WORKERS = int(os.getenv("API_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
+
+    # (user, route) invalidations remembered for those caches
+    CACHE_INVALIDATION_SLOTS = int(os.getenv("API_CACHE_INVALIDATION_SLOTS", "65536"))
+
+    # Number of PBKDF2-derived keys kept in memory (keyed by salt)
+    DERIVED_KEY_CACHE_SIZE = 256
 
     # Keys from environment variables
     ENCRYPTION_KEY = os.getenv("API_ENCRYPTION_KEY", "default-dev-key-change-in-production")
@@ -39,6 +106,9 @@ class EncryptionConfig:
     # Feature flags
     ENCRYPTION_ENABLED = os.getenv("API_ENCRYPTION_ENABLED", "true").lower() == "true"
 
+    # Derive keys and build ciphers at import time in the master (gunicorn --preload)
+    PREFORK_WARMUP = os.getenv("API_PREFORK_WARMUP", "false").lower() == "true"
+
 
 class EncryptionError(Exception):
     """Base exception for encryption errors"""
@@ -55,6 +125,63 @@ class SignatureVerificationError(Exception):
     pass
 
 
+class EnvelopeValidationError(DecryptionError):
+    """Exception raised when an envelope fails a cheap pre-crypto check (or is a replay)"""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _b64_length(size: int) -> int:
+    """Length of the padded Base64 encoding of size bytes"""
+    return 4 * ((size + 2) // 3)
+
+
+# Exact Base64 lengths of fixed-size envelope fields
+ENVELOPE_FIELD_LENGTHS = {
+    "iv": _b64_length(EncryptionConfig.IV_SIZE),
+    "tag": _b64_length(EncryptionConfig.TAG_SIZE),
+    "salt": _b64_length(EncryptionConfig.SALT_SIZE),
+    "signature": _b64_length(hashlib.sha256().digest_size),
+}
+
+# Envelope fields covered by the signature, in the sorted order sign_payload serialises them
+SIGNED_FIELDS = ("alg", "encrypted", "iv", "salt", "tag", "timestamp")
+
+# Base64 envelope fields holding binary values
+BINARY_FIELDS = ("encrypted", "iv", "tag", "salt")
+
+# Characters of a str field encoded per HMAC update when signing without building the message
+SIGNATURE_CHUNK_SIZE = 64 * 1024
+
+# Per-thread scratch buffer for ciphertext+tag (see _scratch_buffer)
+_scratch = threading.local()
+
+
+def _scratch_buffer(size: int) -> memoryview:
+    """
+    Get a writable view of `size` bytes from a buffer reused across messages
+
+    Each thread keeps one buffer, grown to the largest message it has handled up
+    to MAX_BODY_SIZE plus the tag; larger messages get a buffer of their own that
+    is not kept. The view is only valid until the same thread seals or opens the
+    next envelope.
+
+    Args:
+        size: Number of bytes needed
+
+    Returns:
+        memoryview of exactly `size` bytes
+    """
+    buffer = getattr(_scratch, "buffer", None)
+    if buffer is None or len(buffer) < size:
+        buffer = bytearray(size)
+        if size <= EncryptionConfig.MAX_BODY_SIZE + EncryptionConfig.TAG_SIZE:
+            _scratch.buffer = buffer
+    return memoryview(buffer)[:size]
+
+
 def derive_key(passphrase: str, salt: bytes) -> bytes:
     """
     Derive encryption key from passphrase using PBKDF2
@@ -66,7 +193,12 @@ def derive_key(passphrase: str, salt: bytes) -> bytes:
     Returns:
         Derived 256-bit key
     """
-    kdf = PBKDF2(
+    # Imported lazily so processes that never encrypt don't pay for cryptography
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    from cryptography.hazmat.backends import default_backend
+
+    kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=EncryptionConfig.KEY_SIZE,
         salt=salt,
@@ -76,12 +208,235 @@ def derive_key(passphrase: str, salt: bytes) -> bytes:
     return kdf.derive(passphrase.encode())
 
 
-def encrypt_data(data: Dict[str, Any]) -> Dict[str, Any]:
+@lru_cache(maxsize=EncryptionConfig.DERIVED_KEY_CACHE_SIZE)
+def _derive_key_cached(passphrase: str, salt: bytes) -> bytes:
+    encryption_metrics.increment("kdf.derivations")
+    return derive_key(passphrase, salt)
+
+
+def get_derived_key(salt: bytes) -> bytes:
     """
-    Encrypt data using AES-256-GCM
+    Get the encryption key for a salt, running PBKDF2 only for unseen salts
+
+    Args:
+        salt: Salt carried in the envelope
+
+    Returns:
+        Derived 256-bit key
+    """
+    return _derive_key_cached(EncryptionConfig.ENCRYPTION_KEY, salt)
+
+
+class MessageKey(NamedTuple):
+    """Key used to encrypt outgoing messages, with the salt it was derived from and its nonce generator"""
+    salt: bytes
+    key: bytes
+    nonces: NonceGenerator
+
+
+# Per-process message keys: passphrase -> MessageKey
+_message_keys: Dict[str, MessageKey] = {}
+_message_keys_lock = threading.Lock()
+
+
+def get_message_key() -> MessageKey:
+    """
+    Get the salt, key and nonce generator used to encrypt outgoing messages
+
+    The key is derived once per process from a random salt, instead of running
+    PBKDF2 for every message. Each message still gets a fresh IV, and the salt
+    travels in the envelope so receivers derive the same key. A key derived
+    before forking (see app.utils.warmup) is replaced in the child right after
+    os.fork(), so no two processes ever draw nonces for the same key.
+
+    Returns:
+        Current MessageKey
+    """
+    passphrase = EncryptionConfig.ENCRYPTION_KEY
+    message_key = _message_keys.get(passphrase)
+    if message_key is not None:
+        return message_key
+
+    with _message_keys_lock:
+        if passphrase not in _message_keys:
+            _message_keys[passphrase] = _new_message_key(passphrase)
+        return _message_keys[passphrase]
+
+
+def _new_message_key(passphrase: str) -> MessageKey:
+    """Derive a message key from a fresh random salt"""
+    salt = os.urandom(EncryptionConfig.SALT_SIZE)
+    return MessageKey(
+        salt, _derive_key_cached(passphrase, salt), NonceGenerator(EncryptionConfig.NONCE_MESSAGE_LIMIT)
+    )
+
+
+def _renew_message_keys_after_fork() -> None:
+    """Give a forked child its own message keys (its nonce limit is then the key's only budget)"""
+    global _message_keys_lock
+    _message_keys_lock = threading.Lock()  # Another thread may have held it when the parent forked
+    for passphrase in list(_message_keys):
+        _message_keys[passphrase] = _new_message_key(passphrase)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_renew_message_keys_after_fork)
+
+
+def rotate_message_key(message_key: MessageKey) -> None:
+    """
+    Retire a message key so the next get_message_key() derives a new one
+
+    Only the given key is dropped; if another thread already rotated it, this is a no-op.
+
+    Args:
+        message_key: Key to retire
+    """
+    with _message_keys_lock:
+        for passphrase, current in list(_message_keys.items()):
+            if current is message_key:
+                del _message_keys[passphrase]
+                encryption_metrics.increment("encrypt.key_rollovers")
+                logger.warning("Message key reached its nonce limit, rolling over to a new salt and key")
+
+
+def next_message_nonce() -> Tuple[MessageKey, bytes]:
+    """
+    Get the current message key and a nonce that has never been used with it
+
+    Rolls the key over when its nonce budget is used up (see NONCE_MESSAGE_LIMIT).
+
+    Returns:
+        Tuple of (message key, 12-byte nonce)
+    """
+    message_key = get_message_key()
+    while True:
+        try:
+            return message_key, message_key.nonces.next()
+        except NonceExhaustedError:
+            rotate_message_key(message_key)
+            message_key = get_message_key()
+
+
+@lru_cache(maxsize=1)
+def get_replay_cache() -> ReplayCache:
+    """
+    Get the table of accepted envelope IDs
+
+    Opened on first use and shared by the workers on this host when
+    SHARED_STATE_NAME is set (see app.utils.shared_state); per worker
+    otherwise, or when shared memory is unavailable.
+    """
+    name = EncryptionConfig.SHARED_STATE_NAME
+    cache = open_table(
+        ReplayCache, f"{name}-replay" if name else None, slots=EncryptionConfig.REPLAY_CACHE_SLOTS
+    )
+    if EncryptionConfig.REPLAY_PROTECTION and EncryptionConfig.WORKERS > 1 and not cache.is_shared:
+        logger.warning(
+            f"Replay protection is per worker: {EncryptionConfig.WORKERS} workers without a shared "
+            f"replay table, so each worker accepts a replayed envelope once (set API_SHARED_STATE_NAME)"
+        )
+    return cache
+
+
+def validate_envelope(payload: Dict[str, Any], check_timestamp: bool = True) -> None:
+    """
+    Run the cheap pre-crypto checks on an envelope, cheapest first:
+    structure, field lengths, then timestamp age and clock skew
+
+    Args:
+        payload: Encrypted payload with encrypted, iv, tag, salt, timestamp, signature
+        check_timestamp: Enforce MAX_REQUEST_AGE / MAX_CLOCK_SKEW (disable for stored data)
+
+    Raises:
+        EnvelopeValidationError: If any check fails (reason names the check)
+    """
+    # Structure
+    if not isinstance(payload, dict):
+        raise EnvelopeValidationError("Payload is not an object", "structure")
+
+    for field in ("encrypted", "iv", "tag", "salt", "signature"):
+        if not isinstance(payload.get(field), str):
+            raise EnvelopeValidationError(f"Missing or invalid field: {field}", "structure")
+
+    timestamp = payload.get("timestamp")
+    if not isinstance(timestamp, int) or isinstance(timestamp, bool):
+        raise EnvelopeValidationError("Missing or invalid field: timestamp", "structure")
+
+    algorithm = payload.get("alg", LEGACY_ALGORITHM)
+    if not isinstance(algorithm, str) or not is_supported_algorithm(algorithm):
+        raise EnvelopeValidationError(f"Unsupported algorithm: {algorithm}", "algorithm")
+
+    # Field lengths
+    for field, expected_length in ENVELOPE_FIELD_LENGTHS.items():
+        if len(payload[field]) != expected_length:
+            raise EnvelopeValidationError(f"Invalid length for field: {field}", "length")
+
+    if len(payload["encrypted"]) > _b64_length(EncryptionConfig.MAX_BODY_SIZE):
+        raise EnvelopeValidationError("Encrypted data too large", "length")
+
+    if not check_timestamp:
+        return
+
+    # Timestamp and clock skew
+    age = int(time.time() * 1000) - timestamp
+    if age > EncryptionConfig.MAX_REQUEST_AGE:
+        raise EnvelopeValidationError(f"Payload expired (age: {age}ms)", "expired")
+    if -age > EncryptionConfig.MAX_CLOCK_SKEW:
+        raise EnvelopeValidationError(f"Payload timestamp in the future ({-age}ms)", "clock_skew")
+
+
+def _seal(plaintext: bytes, algorithm: str) -> Dict[str, Any]:
+    """
+    Encrypt plaintext into envelope fields
+
+    The AEAD writes ciphertext and tag into the thread's scratch buffer and the
+    Base64 encodings are taken from views of it, so the only allocations that
+    scale with the message are the encoded fields themselves.
+
+    Args:
+        plaintext: Bytes to encrypt
+        algorithm: AEAD algorithm ID
+
+    Returns:
+        Envelope fields in wire order; Base64 values and "alg" as ASCII bytes, timestamp as int
+    """
+    # Get key (derived once per process) and a counter-based IV for it
+    message_key, iv = next_message_nonce()
+    aead = create_aead(algorithm, message_key.key)
+
+    # For all supported AEADs, ciphertext includes the tag at the end
+    size = len(plaintext)
+    if hasattr(aead, "encrypt_into"):
+        sealed = _scratch_buffer(size + EncryptionConfig.TAG_SIZE)
+        aead.encrypt_into(iv, plaintext, None, sealed)
+    else:  # cryptography < 45
+        sealed = memoryview(aead.encrypt(iv, plaintext, None))
+    encryption_metrics.increment("encrypt.bytes", size)
+
+    fields = {
+        "encrypted": binascii.b2a_base64(sealed[:size], newline=False),
+        "iv": binascii.b2a_base64(iv, newline=False),
+        "tag": binascii.b2a_base64(sealed[size:], newline=False),
+        "salt": binascii.b2a_base64(message_key.salt, newline=False),
+        "timestamp": int(time.time() * 1000),
+    }
+
+    # Algorithm ID is omitted for AES-GCM so envelopes stay frontend-compatible
+    if algorithm != LEGACY_ALGORITHM:
+        fields["alg"] = algorithm.encode()
+
+    fields["signature"] = binascii.b2a_base64(_sign_fields(fields), newline=False)
+    return fields
+
+
+def encrypt_data(data: Dict[str, Any], algorithm: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Encrypt data using AES-256-GCM (or another supported AEAD)
 
     Args:
         data: Dictionary to encrypt
+        algorithm: AEAD algorithm ID (defaults to AES-GCM, which the frontend speaks)
 
     Returns:
         Encrypted payload with IV, tag, timestamp, and signature
@@ -90,94 +445,206 @@ def encrypt_data(data: Dict[str, Any]) -> Dict[str, Any]:
         EncryptionError: If encryption fails
     """
     try:
-        # Convert data to JSON
-        json_string = json.dumps(data)
-        plaintext = json_string.encode()
-
-        # Generate salt and derive key
-        salt = os.urandom(EncryptionConfig.SALT_SIZE)
-        key = derive_key(EncryptionConfig.ENCRYPTION_KEY, salt)
-
-        # Generate IV
-        iv = os.urandom(EncryptionConfig.IV_SIZE)
-
-        # Encrypt with AES-GCM
-        aesgcm = AESGCM(key)
-        ciphertext = aesgcm.encrypt(iv, plaintext, None)
-
-        # For AES-GCM, ciphertext includes the tag at the end
-        encrypted_data = ciphertext[:-EncryptionConfig.TAG_SIZE]
-        tag = ciphertext[-EncryptionConfig.TAG_SIZE:]
-
-        # Create payload
-        timestamp = int(time.time() * 1000)
-        payload = {
-            "encrypted": base64.b64encode(encrypted_data).decode(),
-            "iv": base64.b64encode(iv).decode(),
-            "tag": base64.b64encode(tag).decode(),
-            "timestamp": timestamp,
+        plaintext = json.dumps(data).encode()
+        fields = _seal(plaintext, algorithm or LEGACY_ALGORITHM)
+
+        return {
+            name: value if name == "timestamp" else value.decode()
+            for name, value in fields.items()
         }
 
-        # Sign the payload
-        payload["signature"] = sign_payload(payload)
+    except Exception as e:
+        raise EncryptionError(f"Encryption failed: {str(e)}")
+
+
+def encrypt_body(plaintext: bytes, algorithm: Optional[str] = None) -> bytes:
+    """
+    Encrypt a serialised JSON body into a serialised encrypted response body
 
-        return payload
+    Byte-level equivalent of json.dumps(encrypt_response(json.loads(plaintext)))
+    for the middleware: the body is never parsed, and the response is written
+    straight from the encoded fields (compact JSON, same envelope).
 
+    Args:
+        plaintext: JSON response body
+        algorithm: AEAD algorithm ID (defaults to AES-GCM, which the frontend speaks)
+
+    Returns:
+        {"encrypted":true,"payload":{...}} as bytes
+
+    Raises:
+        EncryptionError: If encryption fails
+    """
+    try:
+        fields = _seal(plaintext, algorithm or LEGACY_ALGORITHM)
     except Exception as e:
         raise EncryptionError(f"Encryption failed: {str(e)}")
 
-
-def decrypt_data(payload: Dict[str, Any]) -> Dict[str, Any]:
+    parts = [b'{"encrypted":true,"payload":{']
+    separator = b""
+    for name, value in fields.items():
+        if name == "timestamp":
+            parts.append(b'%s"timestamp":%d' % (separator, value))
+        else:
+            parts += (b'%s"%s":"' % (separator, name.encode()), value, b'"')
+        separator = b","
+    parts.append(b"}}")
+    return b"".join(parts)
+
+
+if sys.version_info >= (3, 11):
+    def _b64decode_strict(value: str) -> bytes:
+        """Decode canonical Base64, raising ValueError on anything else"""
+        return binascii.a2b_base64(value, strict_mode=True)
+else:
+    def _b64decode_strict(value: str) -> bytes:
+        """Decode canonical Base64, raising ValueError on anything else (no strict_mode before 3.11)"""
+        return base64.b64decode(value, validate=True)
+
+
+def _open(payload: Dict[str, Any], check_timestamp: bool) -> bytes:
+    """Check, verify and decrypt an envelope (see decrypt_body); raises the underlying errors"""
+    # Cheap checks (structure, lengths, timestamp)
+    validate_envelope(payload, check_timestamp)
+
+    # Decode Base64 values; envelopes with strict Base64 fields and no extra
+    # keys can be signed field by field without re-serialising them
+    try:
+        decoded = [_b64decode_strict(payload[field]) for field in BINARY_FIELDS]
+        streamable = payload.keys() <= {*SIGNED_FIELDS, "signature"}
+    except ValueError:
+        decoded, streamable = None, False
+
+    # Verify signature before any key derivation
+    if streamable:
+        expected_signature = base64.b64encode(_sign_fields(payload))
+        valid = hmac.compare_digest(payload["signature"].encode(), expected_signature)
+    else:
+        valid = verify_signature(payload)
+    if not valid:
+        raise SignatureVerificationError("Invalid payload signature")
+
+    # Reject envelopes any worker already accepted (only checked within the
+    # timestamp window, which bounds how long IDs must be remembered)
+    if check_timestamp and EncryptionConfig.REPLAY_PROTECTION:
+        replay_id = binascii.a2b_base64(payload["signature"])
+        expires_at = payload["timestamp"] + EncryptionConfig.MAX_REQUEST_AGE
+        if not get_replay_cache().add(replay_id, expires_at):
+            raise EnvelopeValidationError("Envelope was already used", "replay")
+
+    if decoded is None:
+        decoded = [base64.b64decode(payload[field], validate=True) for field in BINARY_FIELDS]
+    encrypted_data, iv, tag, salt = decoded
+
+    # Derive key from the envelope salt (cached after first use)
+    key = get_derived_key(salt)
+
+    # Combine encrypted data and tag in the scratch buffer
+    size = len(encrypted_data)
+    ciphertext = _scratch_buffer(size + len(tag))
+    ciphertext[:size] = encrypted_data
+    ciphertext[size:] = tag
+    del encrypted_data, decoded
+
+    # Decrypt with the envelope's AEAD
+    aead = create_aead(payload.get("alg", LEGACY_ALGORITHM), key)
+    return aead.decrypt(iv, ciphertext, None)
+
+
+def decrypt_body(payload: Dict[str, Any], check_timestamp: bool = True) -> bytes:
     """
-    Decrypt data using AES-256-GCM
+    Decrypt an envelope to its plaintext bytes (serialised JSON), without parsing it
+
+    Checks run cheapest first so forged or stale envelopes are rejected before
+    any expensive work: structure, field lengths, timestamp/clock skew, HMAC
+    signature, replay, and only then key derivation and AEAD decryption.
 
     Args:
-        payload: Encrypted payload with encrypted, iv, tag, timestamp, signature
+        payload: Encrypted payload with encrypted, iv, tag, salt, timestamp, signature
+        check_timestamp: Reject expired and replayed payloads (disable for stored data, e.g. migrations)
 
     Returns:
-        Decrypted data as dictionary
+        Decrypted plaintext
 
     Raises:
         DecryptionError: If decryption fails
         SignatureVerificationError: If signature is invalid
     """
     try:
-        # Verify signature first
-        if not verify_signature(payload):
-            raise SignatureVerificationError("Invalid payload signature")
+        plaintext = _open(payload, check_timestamp)
 
-        # Verify timestamp (prevent replay attacks)
-        timestamp = payload.get("timestamp", 0)
-        age = int(time.time() * 1000) - timestamp
-        if age > EncryptionConfig.MAX_REQUEST_AGE:
-            raise DecryptionError(f"Payload expired (age: {age}ms)")
+    except EnvelopeValidationError as e:
+        encryption_metrics.increment(f"decrypt.rejected.{e.reason}")
+        raise
+    except SignatureVerificationError:
+        encryption_metrics.increment("decrypt.rejected.signature")
+        raise
+    except Exception as e:
+        encryption_metrics.increment("decrypt.rejected.aead")
+        raise DecryptionError(f"Decryption failed: {str(e)}")
 
-        # Decode Base64 values
-        encrypted_data = base64.b64decode(payload["encrypted"])
-        iv = base64.b64decode(payload["iv"])
-        tag = base64.b64decode(payload["tag"])
+    encryption_metrics.increment("decrypt.success")
+    return plaintext
 
-        # Reconstruct salt (in production, include in payload or use fixed salt)
-        salt = os.urandom(EncryptionConfig.SALT_SIZE)
-        key = derive_key(EncryptionConfig.ENCRYPTION_KEY, salt)
 
-        # Combine encrypted data and tag for GCM
-        ciphertext = encrypted_data + tag
+def decrypt_data(payload: Dict[str, Any], check_timestamp: bool = True) -> Dict[str, Any]:
+    """
+    Decrypt data using AES-256-GCM (or the AEAD named by the envelope's "alg")
 
-        # Decrypt with AES-GCM
-        aesgcm = AESGCM(key)
-        plaintext = aesgcm.decrypt(iv, ciphertext, None)
+    Args:
+        payload: Encrypted payload with encrypted, iv, tag, salt, timestamp, signature
+        check_timestamp: Reject expired and replayed payloads (disable for stored data, e.g. migrations)
 
-        # Parse JSON
-        json_string = plaintext.decode()
-        return json.loads(json_string)
+    Returns:
+        Decrypted data as dictionary
 
-    except SignatureVerificationError:
-        raise
-    except Exception as e:
+    Raises:
+        DecryptionError: If decryption fails
+        SignatureVerificationError: If signature is invalid
+    """
+    plaintext = decrypt_body(payload, check_timestamp)
+
+    try:
+        return json.loads(plaintext)
+    except ValueError as e:
         raise DecryptionError(f"Decryption failed: {str(e)}")
 
 
+def _sign_fields(fields: Dict[str, Any]) -> bytes:
+    """
+    HMAC-SHA256 over envelope fields, fed to the MAC piece by piece
+
+    Gives the same digest as sign_payload for envelopes whose string values need
+    no JSON escaping (Base64 and algorithm IDs), without building the serialised
+    message. Values may be ASCII str, bytes or memoryviews; timestamp is an int.
+
+    Args:
+        fields: Envelope fields (signature, if present, is ignored)
+
+    Returns:
+        Raw 32-byte signature
+    """
+    mac = hmac.new(EncryptionConfig.HMAC_KEY.encode(), digestmod=hashlib.sha256)
+    separator = b"{"
+    for name in SIGNED_FIELDS:
+        if name not in fields:
+            continue
+        value = fields[name]
+        if name == "timestamp":
+            mac.update(b'%s"timestamp":%d' % (separator, value))
+        else:
+            mac.update(b'%s"%s":"' % (separator, name.encode()))
+            if isinstance(value, str):
+                for start in range(0, len(value), SIGNATURE_CHUNK_SIZE):
+                    mac.update(value[start:start + SIGNATURE_CHUNK_SIZE].encode("ascii"))
+            else:
+                mac.update(value)
+            mac.update(b'"')
+        separator = b","
+    mac.update(b"}")
+    return mac.digest()
+
+
 def sign_payload(payload: Dict[str, Any]) -> str:
     """
     Sign payload using HMAC-SHA256
@@ -194,8 +661,8 @@ def sign_payload(payload: Dict[str, Any]) -> str:
         if k != "signature"
     }
 
-    # Create HMAC signature
-    message = json.dumps(signature_data, sort_keys=True).encode()
+    # Create HMAC signature (compact separators match the frontend's JSON.stringify)
+    message = json.dumps(signature_data, sort_keys=True, separators=(",", ":")).encode()
     signature = hmac.new(
         EncryptionConfig.HMAC_KEY.encode(),
         message,
@@ -326,12 +793,13 @@ def decrypt_request(data: Dict[str, Any]) -> Dict[str, Any]:
     return data
 
 
-def encrypt_response(data: Dict[str, Any]) -> Dict[str, Any]:
+def encrypt_response(data: Dict[str, Any], algorithm: Optional[str] = None) -> Dict[str, Any]:
     """
     Encrypt response data if encryption is enabled
 
     Args:
         data: Response data
+        algorithm: AEAD algorithm ID negotiated with the client
 
     Returns:
         Encrypted response or original data
@@ -340,7 +808,7 @@ def encrypt_response(data: Dict[str, Any]) -> Dict[str, Any]:
         return data
 
     try:
-        encrypted_payload = encrypt_data(data)
+        encrypted_payload = encrypt_data(data, algorithm)
         return {
             "encrypted": True,
             "payload": encrypted_payload
@@ -351,6 +819,31 @@ def encrypt_response(data: Dict[str, Any]) -> Dict[str, Any]:
         return data
 
 
+def select_default_algorithm() -> str:
+    """
+    Benchmark the supported AEADs and make the fastest the host default
+
+    Skipped when API_ENCRYPTION_ALGORITHM pins the algorithm. The selected
+    algorithm is reported on /health; the results are kept in
+    EncryptionConfig.ALGORITHM_BENCHMARK for /health/details.
+
+    Returns:
+        The selected default algorithm ID
+    """
+    if EncryptionConfig.ALGORITHM_PINNED:
+        if not is_supported_algorithm(EncryptionConfig.ALGORITHM):
+            raise EncryptionError(
+                f"Configured algorithm {EncryptionConfig.ALGORITHM} is not supported "
+                f"(available: {', '.join(get_supported_algorithms())})"
+            )
+        return EncryptionConfig.ALGORITHM
+
+    results = benchmark_algorithms()
+    EncryptionConfig.ALGORITHM_BENCHMARK = results
+    EncryptionConfig.ALGORITHM = max(results, key=results.get)
+    return EncryptionConfig.ALGORITHM
+
+
 # Utility functions for backward compatibility
 def encrypt_if_needed(data: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
     """
@@ -0,0 +1,187 @@
+"""
+ETag Utilities for Encrypted Responses
+Keyed ETags computed from plaintext bytes, plus a bounded cache of recent digests per route and user
+"""
+
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from app.utils.cache_invalidation import CacheInvalidations, cache_invalidations
+from app.utils.encryption import EncryptionConfig
+
+
+@lru_cache(maxsize=4)
+def _etag_key(hmac_key: str) -> bytes:
+    """ETag key, separated from the signing key by a label"""
+    return hmac.new(hmac_key.encode(), b"etag", hashlib.sha256).digest()
+
+
+def compute_etag(plaintext: bytes, route: str, user_key: str) -> str:
+    """
+    Compute a keyed ETag for a plaintext response body
+
+    The ETag is an HMAC rather than a plain hash so it reveals nothing about
+    small or guessable plaintexts, and it is bound to the route and user so
+    equal bodies for different users get different tags. It is weak because
+    each encryption of the same plaintext produces different bytes.
+
+    Args:
+        plaintext: Response body before encryption
+        route: Request path (and query string)
+        user_key: Opaque user identifier (see get_user_key)
+
+    Returns:
+        Weak ETag value, e.g. W/"3q2-7w..."
+    """
+    mac = hmac.new(_etag_key(EncryptionConfig.HMAC_KEY), digestmod=hashlib.sha256)
+    mac.update(route.encode())
+    mac.update(b"\0")
+    mac.update(user_key.encode())
+    mac.update(b"\0")
+    mac.update(plaintext)
+    digest = base64.urlsafe_b64encode(mac.digest()[:18]).decode()
+    return f'W/"{digest}"'
+
+
+def etag_matches(header_value: str, etag: str, weak: bool = True) -> bool:
+    """
+    Check an If-None-Match / If-Range style header against an ETag
+
+    Args:
+        header_value: Comma-separated list of entity tags (or "*")
+        etag: Current ETag
+        weak: Use weak comparison (ignore W/ prefixes)
+
+    Returns:
+        True if any listed tag matches
+    """
+    if weak and etag.startswith("W/"):
+        etag = etag[2:]
+
+    for candidate in header_value.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if weak and candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class DigestCache:
+    """
+    Bounded LRU cache of the most recent ETag per (route, user)
+
+    Lets a conditional GET be answered with 304 without running the route
+    handler while the entry is fresh. Entries expire `ttl` seconds after
+    their data was read and are ignored once the user (or all users) had
+    the route invalidated in any worker (see app.utils.cache_invalidation).
+    Like any cache hit, a 304 from here skips the handler's auth checks; it
+    only tells the client its copy is current.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl: float = 30.0,
+        invalidations: Optional[CacheInvalidations] = None,
+    ):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of (route, user) entries kept
+            ttl: Seconds an entry may answer conditional requests on its own
+            invalidations: Invalidations shared by all workers (defaults to cache_invalidations)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.invalidations = invalidations or cache_invalidations
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        """Generation to pass to `set`, taken before the handler runs"""
+        return self.invalidations.generation()
+
+    def get(self, route: str, user_key: str) -> Optional[str]:
+        """
+        Get the cached ETag for a route and user if still fresh
+
+        Returns:
+            ETag value or None
+        """
+        if self.ttl <= 0 or not self.invalidations.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get((route, user_key))
+            if entry is None:
+                return None
+
+            etag, generation = entry
+            if time.time_ns() - generation > min(self.ttl, self.invalidations.lifetime) * 1e9:
+                del self._entries[(route, user_key)]
+                return None
+
+            self._entries.move_to_end((route, user_key))
+
+        if not self.invalidations.is_fresh(route, user_key, generation):
+            return None
+        return etag
+
+    def set(self, route: str, user_key: str, etag: str, generation: int) -> None:
+        """
+        Store the latest ETag for a route and user
+
+        Args:
+            route: Request path (and query string)
+            user_key: Opaque user identifier (see get_user_key)
+            etag: ETag of the handler's response
+            generation: Value of `generation()` taken before the handler ran
+        """
+        if self.ttl <= 0 or not self.invalidations.enabled:
+            return
+
+        with self._lock:
+            self._entries[(route, user_key)] = (etag, generation)
+            self._entries.move_to_end((route, user_key))
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_key: str, route_prefix: str) -> None:
+        """
+        Drop a user's entries for every route under a prefix, in every worker
+
+        Args:
+            user_key: Opaque user identifier
+            route_prefix: Route prefix that was modified (e.g. "/profile")
+        """
+        self.invalidations.invalidate(user_key, route_prefix)
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if key[1] == user_key and key[0].startswith(route_prefix)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by EncryptionMiddleware and explicit invalidation from route handlers
+digest_cache = DigestCache(
+    max_entries=EncryptionConfig.ETAG_CACHE_SIZE,
+    ttl=EncryptionConfig.ETAG_CACHE_TTL,
+)
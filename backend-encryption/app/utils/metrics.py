@@ -0,0 +1,55 @@
+"""
+Lightweight In-Process Metrics
+Thread-safe counters for encryption work (rejections, shed requests, KDF runs)
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """
+    Named counters that can be incremented from any thread
+
+    Counter names are dotted paths, e.g. "decrypt.rejected.signature".
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """
+        Increment a counter
+
+        Args:
+            name: Counter name
+            value: Amount to add
+        """
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> int:
+        """Get the current value of a counter"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Get a copy of all counters
+
+        Returns:
+            Dictionary of counter name to value, sorted by name
+        """
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def reset(self) -> None:
+        """Reset all counters to zero"""
+        with self._lock:
+            self._counters.clear()
+
+
+# Shared counters for the encryption pipeline
+encryption_metrics = Metrics()
@@ -0,0 +1,88 @@
+"""
+AEAD Nonce Generation
+Per-key 96-bit nonces built from a random prefix and a counter (NIST SP 800-38D deterministic construction)
+"""
+
+import itertools
+import os
+import weakref
+
+# Nonce layout: 8-byte random prefix (fixed field) || 4-byte big-endian counter (invocation field)
+NONCE_PREFIX_SIZE = 8
+NONCE_COUNTER_SIZE = 4
+NONCE_SIZE = NONCE_PREFIX_SIZE + NONCE_COUNTER_SIZE
+
+# NIST SP 800-38D caps GCM invocations per key at 2^32
+GCM_INVOCATION_LIMIT = 2 ** 32
+
+# Messages per key before rollover: 2^24 short of the GCM cap
+DEFAULT_MESSAGE_LIMIT = GCM_INVOCATION_LIMIT - 2 ** 24
+
+
+class NonceExhaustedError(Exception):
+    """Exception raised when a key has used up its nonce budget and must be rolled over"""
+    pass
+
+
+# Live generators, reseeded in the child after os.fork()
+_generators: "weakref.WeakSet[NonceGenerator]" = weakref.WeakSet()
+
+
+class NonceGenerator:
+    """
+    Unique nonces for one key without a syscall per message
+
+    Each nonce is a random prefix chosen once per generator followed by a
+    counter. The counter is an itertools.count, whose next() is atomic under
+    the GIL, so threads never see the same value. After os.fork() the child
+    picks a new prefix and restarts its counter.
+
+    A generator must belong to a single key used by a single process: the
+    limit is only a bound on that key's messages if no other process draws
+    nonces for it (app.utils.encryption gives each forked worker its own
+    message key).
+    """
+
+    def __init__(self, limit: int = DEFAULT_MESSAGE_LIMIT):
+        """
+        Initialize generator
+
+        Args:
+            limit: Nonces handed out before NonceExhaustedError (at most 2^32)
+        """
+        if not 0 < limit <= GCM_INVOCATION_LIMIT:
+            raise ValueError("Nonce limit must be between 1 and 2^32")
+
+        self.limit = limit
+        self.reseed()
+
+        _generators.add(self)
+
+    def reseed(self) -> None:
+        """Pick a new random prefix and restart the counter"""
+        self.prefix = os.urandom(NONCE_PREFIX_SIZE)
+        self._counter = itertools.count()
+
+    def next(self) -> bytes:
+        """
+        Get the next nonce
+
+        Returns:
+            12-byte nonce
+
+        Raises:
+            NonceExhaustedError: If the limit for this key has been reached
+        """
+        count = next(self._counter)
+        if count >= self.limit:
+            raise NonceExhaustedError(f"Nonce limit of {self.limit} messages reached for this key")
+        return self.prefix + count.to_bytes(NONCE_COUNTER_SIZE, "big")
+
+
+def _reseed_after_fork() -> None:
+    for generator in list(_generators):
+        generator.reseed()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
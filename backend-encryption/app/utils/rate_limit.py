@@ -0,0 +1,105 @@
+"""
+Token Bucket Rate Limiting
+Per-client limiter used to shed clients that keep sending undecryptable requests (per process or shared by all workers)
+"""
+
+import time
+from typing import Optional
+
+from app.utils.shared_state import SharedTable
+
+
+class SharedTokenBucketLimiter(SharedTable):
+    """
+    Per-key token bucket kept in a SharedTable, so a client's budget is shared
+    by every worker on the host instead of being multiplied by them (or per
+    worker with name=None)
+
+    Each key starts with `capacity` tokens that refill at `refill_rate` tokens
+    per second. Callers check `is_allowed` before doing expensive work and
+    `consume` a token each time that work is wasted (e.g. a failed decryption),
+    so well-behaved clients are never charged.
+
+    A bucket that has refilled to capacity is equivalent to an untracked key,
+    so its slot is reused; when a probe window is full the least recently
+    updated bucket is dropped. Times are wall-clock so all processes agree.
+    """
+
+    VALUE_FORMAT = "dd"  # Tokens, time of last update
+
+    def __init__(self, name: Optional[str], capacity: float, refill_rate: float, slots: int = 65536):
+        """
+        Initialize limiter
+
+        Args:
+            name: Shared memory segment name (None for a process-local table)
+            capacity: Maximum tokens per key (burst size)
+            refill_rate: Tokens added per second
+            slots: Maximum number of keys tracked
+        """
+        super().__init__(name, slots)
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+    def _refill(self, value: Optional[tuple], now: float) -> float:
+        """Get the refilled token count of a stored bucket"""
+        if value is None:
+            return self.capacity
+
+        tokens, updated_at = value
+        return min(self.capacity, tokens + max(now - updated_at, 0) * self.refill_rate)
+
+    def is_allowed(self, key: str) -> bool:
+        """
+        Check whether a key has at least one token left (does not consume)
+
+        Args:
+            key: Client identifier
+
+        Returns:
+            True if the client may proceed
+        """
+        now = time.time()
+        digest = self._digest(key.encode())
+        stripe, start = self._home(digest)
+        # Read without the stripe lock (it runs for every envelope, consume only on
+        # failures): a read racing a write in another worker sees the bucket before
+        # or after it, or rarely half-written, which at worst misjudges this request
+        _, value = self._probe(digest, stripe, start, now, inserting=False)
+        return self._refill(value, now) >= 1
+
+    def consume(self, key: str, tokens: float = 1) -> bool:
+        """
+        Take tokens from a key's bucket
+
+        Args:
+            key: Client identifier
+            tokens: Number of tokens to take
+
+        Returns:
+            True if the bucket still has tokens left afterwards
+        """
+        now = time.time()
+        digest = self._digest(key.encode())
+        stripe, start = self._home(digest)
+        with self._locked(stripe):
+            offset, value = self._probe(digest, stripe, start, now)
+            remaining = max(self._refill(value, now) - tokens, 0)
+            self._store(offset, digest, remaining, now)
+            return remaining >= 1
+
+    def reset(self, key: str) -> None:
+        """Forget a key's bucket"""
+        now = time.time()
+        digest = self._digest(key.encode())
+        stripe, start = self._home(digest)
+        with self._locked(stripe):
+            offset, value = self._probe(digest, stripe, start, now)
+            if value is not None:
+                self._store(offset, digest, self.capacity, now)
+
+    def _is_reusable(self, value: tuple, now: float) -> bool:
+        return self._refill(value, now) >= self.capacity
+
+    def _eviction_order(self, value: tuple) -> float:
+        return value[1]
@@ -0,0 +1,335 @@
+"""
+Worker Health and Readiness
+Background crypto self-test and saturation sampling (event-loop lag, thread pool queue, DB pools) published as a cached snapshot
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessConfig:
+    """Configuration for the readiness monitor"""
+
+    # Seconds between published snapshots
+    SNAPSHOT_INTERVAL = float(os.getenv("API_READINESS_INTERVAL", "1.0"))
+
+    # Seconds between event-loop lag samples (the snapshot reports the worst of its window)
+    LAG_SAMPLE_INTERVAL = 0.1
+
+    # Seconds between crypto self-tests
+    SELF_TEST_INTERVAL = float(os.getenv("API_SELF_TEST_INTERVAL", "30"))
+
+    # Not ready above these: event-loop lag, calls waiting for a worker thread, DB pool use
+    MAX_LOOP_LAG_MS = float(os.getenv("API_READINESS_MAX_LOOP_LAG_MS", "250"))
+    MAX_THREAD_QUEUE = int(os.getenv("API_READINESS_MAX_THREAD_QUEUE", "20"))
+    MAX_POOL_SATURATION = float(os.getenv("API_READINESS_MAX_POOL_SATURATION", "0.95"))
+
+    # A snapshot older than this many intervals means the monitor stopped
+    STALE_INTERVALS = 5
+
+    # Token for /health/details (X-Health-Token header); empty disables the route
+    DETAILS_TOKEN = os.getenv("API_HEALTH_DETAILS_TOKEN", "")
+
+
+class SelfTestError(Exception):
+    """Exception raised when a crypto self-test produces a wrong result"""
+    pass
+
+
+# Typical small response body used by the AEAD self-test
+SELF_TEST_PLAINTEXT = json.dumps({"self_test": True, "items": list(range(200))}).encode()
+
+
+def run_self_test() -> Dict[str, float]:
+    """
+    Check every supported AEAD and the envelope HMAC
+
+    Each AEAD must round-trip a sample and reject it after a one-bit change;
+    the HMAC must verify a signed sample envelope with the configured key and
+    reject it once a field changes. A fresh random key is used for the AEADs,
+    so the process message key and its nonce counter are not touched.
+
+    Returns:
+        Duration of each check in milliseconds
+
+    Raises:
+        SelfTestError: If a check fails
+    """
+    from cryptography.exceptions import InvalidTag
+
+    from app.utils.ciphers import get_aead_class, get_supported_algorithms
+    from app.utils.encryption import sign_payload, verify_signature
+
+    timings = {}
+    key, nonce = os.urandom(32), os.urandom(12)
+
+    for algorithm_id in get_supported_algorithms():
+        start = time.perf_counter()
+        aead = get_aead_class(algorithm_id)(key)
+        sealed = aead.encrypt(nonce, SELF_TEST_PLAINTEXT, None)
+        if aead.decrypt(nonce, sealed, None) != SELF_TEST_PLAINTEXT:
+            raise SelfTestError(f"{algorithm_id} round trip mismatch")
+
+        tampered = bytearray(sealed)
+        tampered[0] ^= 1
+        try:
+            aead.decrypt(nonce, bytes(tampered), None)
+        except InvalidTag:
+            pass
+        else:
+            raise SelfTestError(f"{algorithm_id} accepted a tampered ciphertext")
+        timings[algorithm_id] = round((time.perf_counter() - start) * 1000, 3)
+
+    start = time.perf_counter()
+    envelope = {"encrypted": "c2VsZi10ZXN0", "iv": "", "tag": "", "salt": "", "timestamp": int(time.time() * 1000)}
+    envelope["signature"] = sign_payload(envelope)
+    if not verify_signature(envelope):
+        raise SelfTestError("HMAC signature did not verify")
+    if verify_signature(dict(envelope, timestamp=envelope["timestamp"] + 1)):
+        raise SelfTestError("HMAC accepted a modified envelope")
+    timings["HMAC-SHA256"] = round((time.perf_counter() - start) * 1000, 3)
+
+    return timings
+
+
+class Snapshot(NamedTuple):
+    """Published readiness state with every response body already serialised"""
+    ready: bool
+    healthy: bool
+    taken_at: float  # time.monotonic()
+    ready_body: bytes
+    health_body: bytes
+    details_body: bytes
+
+
+# Served when the monitor has not published recently
+STALE_BODY = json.dumps({"status": "not_ready", "ready": False, "reasons": ["stale_snapshot"]}).encode()
+
+
+class ReadinessMonitor:
+    """
+    Samples worker load in the background and publishes a readiness snapshot
+
+    A task on the worker's event loop measures loop lag every
+    LAG_SAMPLE_INTERVAL, and every SNAPSHOT_INTERVAL reads the thread pool
+    (anyio's default limiter, used by sync routes and to_thread calls), the
+    registered DB pools and the encryption metrics; the crypto self-test runs
+    every SELF_TEST_INTERVAL. The result is serialised once per interval, so
+    /health and /ready only return bytes that already exist.
+
+    /health is "alive and able to encrypt" (warm-up done, self-test passing);
+    /ready additionally requires the worker not to be saturated, so a load
+    balancer can take a busy worker out of rotation without restarting it.
+    Both only return their status and the failing checks (/health also names
+    the default AEAD chosen at startup); the measurements (pid, thread pool,
+    pools, self-test timings, AEAD benchmark, encryption metrics) are in the
+    details body behind /health/details.
+    """
+
+    def __init__(self):
+        self.info: Dict[str, Any] = {}
+        self._pools: Dict[str, Callable[[], Tuple[int, int]]] = {}
+        self._snapshot: Optional[Snapshot] = None
+        self._self_test: Dict[str, Any] = {"ok": None, "ran_at": None, "duration_ms": None, "timings_ms": {}, "error": None}
+        self._task: Optional[asyncio.Task] = None
+
+    def register_pool(self, name: str, stats: Callable[[], Tuple[int, int]]) -> None:
+        """
+        Report a connection pool's saturation
+
+        Args:
+            name: Pool name shown in the snapshot (e.g. "database")
+            stats: Returns (connections in use, pool size); called once per snapshot,
+                must not block (e.g. lambda: (engine.pool.checkedout(), engine.pool.size()))
+        """
+        self._pools[name] = stats
+
+    async def start(self, **info: Any) -> None:
+        """
+        Publish a first snapshot and start sampling (call from the lifespan hook after warm-up)
+
+        Args:
+            **info: Static fields added to /health (e.g. service name and version)
+        """
+        self.info.update(info)
+        self.refresh()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling (call on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def current(self) -> Snapshot:
+        """
+        Get the latest snapshot
+
+        Without the background task (start() never called) a snapshot is taken
+        on read, at most once per SNAPSHOT_INTERVAL.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or (
+            self._task is None and time.monotonic() - snapshot.taken_at > ReadinessConfig.SNAPSHOT_INTERVAL
+        ):
+            snapshot = self.refresh()
+        return snapshot
+
+    def is_stale(self, snapshot: Snapshot) -> bool:
+        """Whether the background task has stopped publishing (e.g. it crashed)"""
+        max_age = ReadinessConfig.SNAPSHOT_INTERVAL * ReadinessConfig.STALE_INTERVALS
+        return self._task is not None and time.monotonic() - snapshot.taken_at > max_age
+
+    async def _run(self) -> None:
+        """Sample loop lag continuously; publish and self-test on their intervals"""
+        loop = asyncio.get_running_loop()
+        lags: List[float] = []
+        next_publish = loop.time() + ReadinessConfig.SNAPSHOT_INTERVAL
+        next_self_test = loop.time() + ReadinessConfig.SELF_TEST_INTERVAL
+
+        while True:
+            due = loop.time() + ReadinessConfig.LAG_SAMPLE_INTERVAL
+            await asyncio.sleep(ReadinessConfig.LAG_SAMPLE_INTERVAL)
+            now = loop.time()
+            lags.append(max(now - due, 0.0))
+
+            if now < next_publish:
+                continue
+
+            try:
+                if now >= next_self_test:
+                    self._run_self_test()
+                    next_self_test = now + ReadinessConfig.SELF_TEST_INTERVAL
+                self.publish(lags)
+            except Exception as e:
+                logger.error(f"Readiness snapshot failed: {e}")
+            lags = []
+            next_publish = now + ReadinessConfig.SNAPSHOT_INTERVAL
+
+    def refresh(self) -> Snapshot:
+        """Run the self-test and publish a snapshot now (without loop lag samples)"""
+        self._run_self_test()
+        return self.publish([])
+
+    def _run_self_test(self) -> None:
+        """Run the crypto self-test and keep its result for the next snapshots"""
+        start = time.perf_counter()
+        try:
+            timings, error = run_self_test(), None
+        except Exception as e:
+            timings, error = {}, f"{type(e).__name__}: {e}"
+            logger.error(f"Crypto self-test failed: {error}")
+
+        self._self_test = {
+            "ok": error is None,
+            "ran_at": int(time.time()),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "timings_ms": timings,
+            "error": error,
+        }
+
+    def publish(self, lags: List[float]) -> Snapshot:
+        """
+        Build, serialise and publish a snapshot (runs on the event loop)
+
+        Args:
+            lags: Event-loop lag samples in seconds since the last snapshot
+
+        Returns:
+            The published snapshot
+        """
+        import anyio.to_thread
+
+        from app.utils.encryption import EncryptionConfig
+        from app.utils.metrics import encryption_metrics
+        from app.utils.warmup import get_warmup_status
+
+        reasons = []
+
+        warmup = get_warmup_status()
+        if not warmup["ready"]:
+            reasons.append("warming_up")
+        if not self._self_test["ok"]:
+            reasons.append("self_test_failed")
+
+        max_lag_ms = round(max(lags, default=0.0) * 1000, 2)
+        event_loop = {
+            "lag_ms": round(lags[-1] * 1000, 2) if lags else 0.0,
+            "max_lag_ms": max_lag_ms,
+            "samples": len(lags),
+        }
+        if max_lag_ms > ReadinessConfig.MAX_LOOP_LAG_MS:
+            reasons.append("event_loop_lag")
+
+        limiter = anyio.to_thread.current_default_thread_limiter().statistics()
+        executor = {
+            "threads_busy": limiter.borrowed_tokens,
+            "threads_total": limiter.total_tokens,
+            "queue_depth": limiter.tasks_waiting,
+        }
+        if limiter.tasks_waiting > ReadinessConfig.MAX_THREAD_QUEUE:
+            reasons.append("thread_pool_queue")
+
+        pools = {}
+        for name, stats in self._pools.items():
+            try:
+                in_use, size = stats()
+            except Exception as e:
+                pools[name] = {"error": f"{type(e).__name__}: {e}"}
+                reasons.append(f"pool_error:{name}")
+                continue
+            saturation = round(in_use / size, 3) if size else 1.0
+            pools[name] = {"in_use": in_use, "size": size, "saturation": saturation}
+            if saturation >= ReadinessConfig.MAX_POOL_SATURATION:
+                reasons.append(f"pool_saturated:{name}")
+
+        healthy = warmup["ready"] and bool(self._self_test["ok"])
+        ready = not reasons
+        health_status = "healthy" if healthy else "starting" if not warmup["ready"] else "unhealthy"
+        readiness = {"status": "ready" if ready else "not_ready", "ready": ready, "reasons": reasons}
+        health = {
+            **self.info,
+            "status": health_status,
+            "ready": ready,
+            "reasons": reasons,
+            "encryption_algorithm": EncryptionConfig.ALGORITHM,
+        }
+        details = {
+            **health,
+            "pid": os.getpid(),
+            "taken_at": int(time.time()),
+            "self_test": self._self_test,
+            "event_loop": event_loop,
+            "executor": executor,
+            "pools": pools,
+            "warmup": warmup,
+            "encryption_enabled": EncryptionConfig.ENCRYPTION_ENABLED,
+            "encryption_algorithm_benchmark": EncryptionConfig.ALGORITHM_BENCHMARK,
+            "encryption_metrics": encryption_metrics.snapshot(),
+        }
+
+        snapshot = Snapshot(
+            ready=ready,
+            healthy=healthy,
+            taken_at=time.monotonic(),
+            ready_body=json.dumps(readiness).encode(),
+            health_body=json.dumps(health).encode(),
+            details_body=json.dumps(details).encode(),
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+
+# Per-worker monitor behind /health and /ready (see app.routes.health)
+readiness_monitor = ReadinessMonitor()
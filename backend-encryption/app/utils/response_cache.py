@@ -0,0 +1,174 @@
+"""
+Per-User Response Cache for Encrypted GET Routes
+Keeps serialized plaintext responses per (route, user) so repeat GETs skip the route handler; every hit is encrypted afresh
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.utils.cache_invalidation import CacheInvalidations, cache_invalidations
+from app.utils.encryption import EncryptionConfig
+
+
+class CachedResponse(NamedTuple):
+    """Plaintext response as produced by the route handler"""
+    status_code: int
+    raw_headers: List[Tuple[bytes, bytes]]  # Without Content-Length
+    body: bytes
+    etag: str
+
+    @property
+    def size(self) -> int:
+        """Approximate memory charged to the entry in bytes"""
+        return len(self.body) + sum(len(name) + len(value) for name, value in self.raw_headers)
+
+
+class ResponseCache:
+    """
+    Memory-bounded LRU cache of plaintext responses per (route, user)
+
+    Only plaintext is stored; the middleware encrypts each hit with a fresh
+    nonce, so cached and uncached responses are indistinguishable on the wire.
+    Entries expire `ttl` seconds after their data was read and are ignored
+    once the same user successfully writes to the route (or a route
+    configured to invalidate it) in any worker: callers take `generation()`
+    before running the handler and pass it to `set`, and every hit is checked
+    against the shared invalidations (see app.utils.cache_invalidation).
+
+    A hit skips the route handler, including its auth checks: a revoked token
+    keeps reading its cached responses until they expire, so keep `ttl` short.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 10.0,
+        invalidations: Optional[CacheInvalidations] = None,
+    ):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of (route, user) entries kept
+            max_bytes: Maximum total size of cached bodies and headers
+            ttl: Seconds an entry may be served (0 disables the cache)
+            invalidations: Invalidations shared by all workers (defaults to cache_invalidations)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.invalidations = invalidations or cache_invalidations
+        self.size = 0
+        self._cleared_at = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[CachedResponse, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether entries may be served (see CacheInvalidations.enabled)"""
+        return self.ttl > 0 and self.invalidations.enabled
+
+    def generation(self) -> int:
+        """Generation to pass to `set`, taken before the handler runs"""
+        return self.invalidations.generation()
+
+    def get(self, route: str, user_key: str) -> Optional[CachedResponse]:
+        """
+        Get the cached response for a route and user if still fresh
+
+        Returns:
+            CachedResponse or None
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get((route, user_key))
+            if entry is None:
+                return None
+
+            response, generation = entry
+            if time.time_ns() - generation > min(self.ttl, self.invalidations.lifetime) * 1e9:
+                self._remove((route, user_key))
+                return None
+
+            self._entries.move_to_end((route, user_key))
+
+        if not self.invalidations.is_fresh(route, user_key, generation):
+            return None
+        return response
+
+    def set(self, route: str, user_key: str, response: CachedResponse, generation: int) -> bool:
+        """
+        Store a response unless the route was invalidated since `generation` was taken
+
+        Args:
+            route: Request path (and query string)
+            user_key: Opaque user identifier (see get_user_key)
+            response: Plaintext response to cache
+            generation: Value of `generation()` taken before the handler ran
+
+        Returns:
+            True if the response was stored
+        """
+        if not self.enabled or response.size > self.max_bytes:
+            return False
+
+        # A write (in any worker) that finished while the handler ran makes its data stale
+        if not self.invalidations.is_fresh(route, user_key, generation):
+            return False
+
+        with self._lock:
+            if generation < self._cleared_at:
+                return False
+
+            self._remove((route, user_key))
+            self._entries[(route, user_key)] = (response, generation)
+            self.size += response.size
+
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+            return True
+
+    def invalidate(self, user_key: Optional[str], route_prefix: str) -> None:
+        """
+        Drop entries for every route under a prefix, in every worker
+
+        Args:
+            user_key: Opaque user identifier, or None for all users
+            route_prefix: Route prefix that was modified (e.g. "/profile")
+        """
+        self.invalidations.invalidate(user_key, route_prefix)
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (user_key is None or key[1] == user_key) and key[0].startswith(route_prefix)
+            ]
+            for key in stale:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all entries (in this worker)"""
+        with self._lock:
+            self._cleared_at = self.invalidations.generation()
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        """Remove an entry if present (caller holds the lock)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[0].size
+
+
+# Shared by EncryptionMiddleware and route handlers that need explicit invalidation
+response_cache = ResponseCache(
+    max_entries=EncryptionConfig.RESPONSE_CACHE_SIZE,
+    max_bytes=EncryptionConfig.RESPONSE_CACHE_MAX_BYTES,
+    ttl=EncryptionConfig.RESPONSE_CACHE_TTL,
+)
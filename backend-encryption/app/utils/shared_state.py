@@ -0,0 +1,473 @@
+"""
+Host-Wide Shared State for API Workers
+Fixed-size hash tables in multiprocessing.shared_memory so every worker on a host sees the same replay IDs and counters
+
+Segments outlive the workers; remove a deployment's tables once it is stopped:
+    python -m app.utils.shared_state unlink <API_SHARED_STATE_NAME>
+"""
+
+import argparse
+import glob
+import hashlib
+import logging
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Iterator, List, Optional, Tuple, Type, TypeVar
+
+from app.utils.metrics import encryption_metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: tables fall back to process-local buffers
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Segment header: magic, layout version, slot count, slot size, stripe count, hash key
+HEADER = struct.Struct("<8sIIII16s")
+HEADER_SIZE = 64
+MAGIC = b"APISTATE"
+LAYOUT_VERSION = 1
+
+# Keys are stored as keyed BLAKE2b digests; an all-zero digest marks a never-used slot
+DIGEST_SIZE = 16
+EMPTY_DIGEST = bytes(DIGEST_SIZE)
+
+# Slots examined per lookup (all within the key's stripe)
+PROBE_LIMIT = 16
+
+# Byte of the lock file held while a process creates or attaches to a segment
+# (stripe locks use bytes 0..stripes-1)
+ATTACH_LOCK_BYTE = 1 << 20
+
+T = TypeVar("T", bound="SharedTable")
+
+
+class SharedStateError(Exception):
+    """Exception raised when a shared segment cannot be attached"""
+    pass
+
+
+def _open_segment(name: str, create: bool, size: int = 0) -> shared_memory.SharedMemory:
+    """Open a shared memory segment that outlives the processes using it"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create=create, size=size, track=False)
+
+    # Before 3.13 every process that opens a segment registers it with its
+    # resource tracker, which unlinks it when that process exits, pulling the
+    # table out from under the other workers
+    from multiprocessing import resource_tracker
+
+    segment = shared_memory.SharedMemory(name, create=create, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _unlink_segment(segment: shared_memory.SharedMemory) -> None:
+    """Remove a segment opened with _open_segment from the host"""
+    if sys.version_info < (3, 13):
+        # unlink() also unregisters the segment from the resource tracker (see _open_segment)
+        from multiprocessing import resource_tracker
+        resource_tracker.register(segment._name, "shared_memory")
+    segment.unlink()
+
+
+def lock_path(name: str) -> str:
+    """Path of the lock file guarding a segment's stripes"""
+    return os.path.join(tempfile.gettempdir(), f"{name}.lock")
+
+
+class SharedTable:
+    """
+    Fixed-size open-addressing hash table in a shared memory segment
+
+    Each slot holds a 16-byte key digest followed by a struct-packed value
+    (VALUE_FORMAT). The table is split into stripes with one lock each: a
+    thread lock plus an fcntl byte-range lock on a companion file, so it also
+    excludes other processes. A key only ever probes slots of its home stripe,
+    so an operation takes a single lock and touches at most PROBE_LIMIT slots.
+
+    The table never grows and slots are never cleared: subclasses say when a
+    slot may be reused (_is_reusable, e.g. expired) and which live entry goes
+    first when a key's probe window is full (_eviction_order).
+
+    With name=None the table lives in a private buffer guarded by thread locks
+    only (single worker, or hosts without shared memory / fcntl).
+    """
+
+    # struct format of a slot's value (without byte order prefix)
+    VALUE_FORMAT = ""
+
+    def __init__(self, name: Optional[str], slots: int, stripes: int = 64):
+        """
+        Create or attach to a table
+
+        Args:
+            name: Shared memory segment name (None for a process-local table)
+            slots: Number of entries (rounded down to a multiple of stripes)
+            stripes: Number of independently locked regions
+
+        Raises:
+            SharedStateError: If an existing segment has a different layout
+        """
+        self.name = name
+        self.value = struct.Struct("<" + self.VALUE_FORMAT)
+        self.slot_size = DIGEST_SIZE + self.value.size
+        self.stripes = max(min(stripes, slots), 1)
+        self.slots_per_stripe = max(slots // self.stripes, 1)
+        self.slots = self.slots_per_stripe * self.stripes
+        self._probe_limit = min(PROBE_LIMIT, self.slots_per_stripe)
+        self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        self._lock_fd: Optional[int] = None
+
+        size = HEADER_SIZE + self.slots * self.slot_size
+        if name is None:
+            self._buffer = memoryview(bytearray(size))
+            self._hash_key = os.urandom(16)
+        else:
+            self._lock_fd = os.open(lock_path(name), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                self._segment = self._attach(name, size)
+            except BaseException:
+                self.close()
+                raise
+            self._buffer = self._segment.buf
+            self._hash_key = HEADER.unpack_from(self._buffer)[5]
+
+    @property
+    def is_shared(self) -> bool:
+        """Whether the table is visible to other processes"""
+        return self._segment is not None
+
+    def _attach(self, name: str, size: int) -> shared_memory.SharedMemory:
+        """Create the segment, or attach to one another worker created and check its layout"""
+        layout = (LAYOUT_VERSION, self.slots, self.slot_size, self.stripes)
+
+        # Workers attach one at a time, so none sees a half-written header and
+        # (before 3.13) workers sharing a resource tracker never interleave
+        # their register/unregister messages
+        fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, ATTACH_LOCK_BYTE)
+        try:
+            try:
+                segment = _open_segment(name, create=True, size=size)
+            except FileExistsError:
+                segment = _open_segment(name, create=False)
+
+            if segment.size < size:
+                segment.close()
+                raise SharedStateError(f"Shared state segment {name} is smaller than expected")
+
+            if bytes(segment.buf[:len(MAGIC)]) != MAGIC:
+                # New (zero-filled) segment, or its creator died before writing the header
+                HEADER.pack_into(segment.buf, 0, MAGIC, *layout, os.urandom(16))
+                logger.info(f"Created shared state segment {name} ({size} bytes, {self.slots} slots)")
+            elif HEADER.unpack_from(segment.buf)[1:5] != layout:
+                segment.close()
+                raise SharedStateError(
+                    f"Shared state segment {name} has a different layout "
+                    f"(unlink it or change API_SHARED_STATE_NAME)"
+                )
+            return segment
+        finally:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, ATTACH_LOCK_BYTE)
+
+    def close(self) -> None:
+        """Detach from the segment (other workers keep using it)"""
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        if self._segment is not None:
+            self._segment.close()
+
+    def unlink(self) -> None:
+        """Remove the segment and its lock file from the host (call once, e.g. from tooling)"""
+        if self._segment is not None:
+            _unlink_segment(self._segment)
+            try:
+                os.unlink(lock_path(self.name))
+            except FileNotFoundError:
+                pass
+
+    @contextmanager
+    def _locked(self, stripe: int) -> Iterator[None]:
+        """Hold a stripe's lock in this thread and, for shared tables, in this process"""
+        with self._thread_locks[stripe]:
+            if self._lock_fd is None:
+                yield
+                return
+
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, stripe)
+
+    def _digest(self, key: bytes) -> bytes:
+        """Keyed digest of a key (the per-segment key keeps clients from steering keys into one stripe)"""
+        digest = hashlib.blake2b(key, digest_size=DIGEST_SIZE, key=self._hash_key).digest()
+        return digest if digest != EMPTY_DIGEST else b"\x01" + digest[1:]
+
+    def _home(self, digest: bytes) -> Tuple[int, int]:
+        """Stripe and first slot (within the stripe) of a digest"""
+        index = int.from_bytes(digest[:8], "little") % self.slots
+        return divmod(index, self.slots_per_stripe)
+
+    def _probe(
+        self, digest: bytes, stripe: int, start: int, now: float, inserting: bool = True
+    ) -> Tuple[int, Optional[tuple]]:
+        """
+        Find a digest's slot (caller holds the stripe lock, unless it only reads
+        and tolerates seeing a slot that another process is writing)
+
+        Args:
+            inserting: Whether the caller stores into the returned slot (counts evictions)
+
+        Returns:
+            (offset, value) if the digest is stored, otherwise (offset, None)
+            where offset is the slot to insert into: a never-used or reusable
+            slot if the probe window has one, else the live entry to evict
+        """
+        buffer = self._buffer
+        base = HEADER_SIZE + stripe * self.slots_per_stripe * self.slot_size
+        insert_at = None
+        evict_at, evict_order = None, None
+
+        for i in range(self._probe_limit):
+            offset = base + ((start + i) % self.slots_per_stripe) * self.slot_size
+            slot_digest = buffer[offset:offset + DIGEST_SIZE]
+            if slot_digest == digest:
+                return offset, self.value.unpack_from(buffer, offset + DIGEST_SIZE)
+
+            if slot_digest == EMPTY_DIGEST:
+                # Nothing was ever stored past a never-used slot
+                return (offset if insert_at is None else insert_at), None
+
+            if insert_at is None:
+                value = self.value.unpack_from(buffer, offset + DIGEST_SIZE)
+                if self._is_reusable(value, now):
+                    insert_at = offset
+                else:
+                    order = self._eviction_order(value)
+                    if evict_order is None or order < evict_order:
+                        evict_at, evict_order = offset, order
+
+        if insert_at is not None:
+            return insert_at, None
+
+        if inserting:
+            encryption_metrics.increment(f"shared_state.evictions.{type(self).__name__}")
+        return evict_at, None
+
+    def _store(self, offset: int, digest: bytes, *value) -> None:
+        """Write a slot (caller holds the stripe lock)"""
+        self._buffer[offset:offset + DIGEST_SIZE] = digest
+        self.value.pack_into(self._buffer, offset + DIGEST_SIZE, *value)
+
+    def _is_reusable(self, value: tuple, now: float) -> bool:
+        """Whether a stored entry may be overwritten by another key"""
+        raise NotImplementedError
+
+    def _eviction_order(self, value: tuple) -> float:
+        """Sort key for evicting live entries from a full probe window (lowest first)"""
+        raise NotImplementedError
+
+
+class ReplayCache(SharedTable):
+    """
+    Envelope IDs seen within the replay window, shared by all workers
+
+    Each ID is kept until its expiry time; once an envelope's timestamp is
+    older than MAX_REQUEST_AGE it is rejected before reaching this table, so
+    expired slots are reused. Size the table for the number of envelopes
+    accepted per window: a full probe window evicts the entry closest to
+    expiry (counted in shared_state.evictions.ReplayCache).
+    """
+
+    VALUE_FORMAT = "q"  # Expiry, ms since the epoch
+
+    def add(self, replay_id: bytes, expires_at: int) -> bool:
+        """
+        Record an ID unless it is already recorded
+
+        Args:
+            replay_id: Unique envelope ID (e.g. its signature)
+            expires_at: Time the ID may be forgotten, in ms since the epoch
+
+        Returns:
+            True if the ID is new, False if it was seen before (a replay)
+        """
+        now = int(time.time() * 1000)
+        digest = self._digest(replay_id)
+        stripe, start = self._home(digest)
+
+        with self._locked(stripe):
+            offset, value = self._probe(digest, stripe, start, now)
+            if value is not None and value[0] > now:
+                return False
+            self._store(offset, digest, expires_at)
+            return True
+
+    def _is_reusable(self, value: tuple, now: float) -> bool:
+        return value[0] <= now
+
+    def _eviction_order(self, value: tuple) -> float:
+        return value[0]
+
+
+class InvalidationTable(SharedTable):
+    """
+    Time of the latest invalidation per key, shared by all workers
+
+    Caches that skip work on a hit record when they read their data and
+    check here that nothing was invalidated since (see
+    app.utils.cache_invalidation). A record is kept for `lifetime` seconds,
+    as long as any cached entry can be served, then its slot is reused.
+
+    Every key probes its whole stripe, so when records have to be evicted the
+    oldest in the stripe goes first. A key missing from a stripe full of live
+    records may have been evicted, and is reported as invalidated just now:
+    under that pressure caches miss instead of serving stale data.
+    """
+
+    VALUE_FORMAT = "q"  # Time of the latest invalidation, ns since the epoch
+
+    def __init__(self, name: Optional[str], slots: int, lifetime: float):
+        """
+        Create or attach to a table
+
+        Args:
+            name: Shared memory segment name (None for a process-local table)
+            slots: Number of keys tracked
+            lifetime: Seconds an invalidation is remembered
+        """
+        # One probe window per stripe (see above)
+        stripes = max(slots // PROBE_LIMIT, 1)
+        super().__init__(name, min(slots, stripes * PROBE_LIMIT), stripes=stripes)
+        self.lifetime_ns = int(lifetime * 1e9)
+
+    def invalidate(self, key: bytes) -> None:
+        """Record that a key was invalidated now"""
+        now = time.time_ns()
+        digest = self._digest(key)
+        stripe, start = self._home(digest)
+
+        with self._locked(stripe):
+            offset, _ = self._probe(digest, stripe, start, now)
+            self._store(offset, digest, now)
+
+    def invalidated_at(self, key: bytes) -> int:
+        """
+        Get the time a key was last invalidated
+
+        Returns:
+            ns since the epoch; 0 if it was not invalidated within the
+            lifetime, the current time if its record may have been evicted
+        """
+        now = time.time_ns()
+        digest = self._digest(key)
+        stripe, start = self._home(digest)
+
+        with self._locked(stripe):
+            offset, value = self._probe(digest, stripe, start, now, inserting=False)
+            if value is not None:
+                return value[0]
+
+            # Not stored: free slot (never recorded, or expired) vs full stripe (maybe evicted)
+            if self._buffer[offset:offset + DIGEST_SIZE] == EMPTY_DIGEST:
+                return 0
+            if self._is_reusable(self.value.unpack_from(self._buffer, offset + DIGEST_SIZE), now):
+                return 0
+            return now
+
+    def _is_reusable(self, value: tuple, now: float) -> bool:
+        return value[0] + self.lifetime_ns <= now
+
+    def _eviction_order(self, value: tuple) -> float:
+        return value[0]
+
+
+def open_table(table_class: Type[T], name: Optional[str], **kwargs) -> T:
+    """
+    Open a table shared by the workers on this host, or a process-local one
+
+    Falls back to a process-local table (with a warning) when no name is
+    configured or the segment cannot be used, so a misconfigured host still
+    serves requests with per-worker state.
+
+    Args:
+        table_class: SharedTable subclass
+        name: Segment name (empty/None for a process-local table)
+        **kwargs: Passed to the table constructor
+
+    Returns:
+        Table instance
+    """
+    if name and fcntl is not None:
+        try:
+            return table_class(name, **kwargs)
+        except (OSError, SharedStateError) as e:
+            logger.warning(f"Shared state {name} unavailable, using a per-worker table: {e}")
+
+    return table_class(None, **kwargs)
+
+
+def unlink_tables(prefix: str) -> List[str]:
+    """
+    Remove every table named "<prefix>-<table>" and its lock file from the host
+
+    Tables are found through their lock files, so this works without knowing
+    their layout. Call it once no worker of the deployment is running: workers
+    still attached keep the old segment while new ones create an empty table.
+
+    Args:
+        prefix: Shared state name (API_SHARED_STATE_NAME)
+
+    Returns:
+        Names of the removed tables
+    """
+    removed = []
+    pattern = os.path.join(tempfile.gettempdir(), f"{glob.escape(prefix)}-*.lock")
+    for path in sorted(glob.glob(pattern)):
+        name = os.path.basename(path)[:-len(".lock")]
+        try:
+            segment = _open_segment(name, create=False)
+        except FileNotFoundError:
+            pass
+        else:
+            segment.close()
+            _unlink_segment(segment)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        removed.append(name)
+    return removed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.utils.shared_state",
+        description="Manage the shared memory tables of API workers on this host",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    unlink_parser = subparsers.add_parser("unlink", help="Remove a deployment's tables (stop its workers first)")
+    unlink_parser.add_argument("name", help="Shared state name (API_SHARED_STATE_NAME)")
+    args = parser.parse_args(argv)
+
+    removed = unlink_tables(args.name)
+    for name in removed:
+        print(f"Removed {name}")
+    if not removed:
+        print(f"No tables named {args.name}-* on this host")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
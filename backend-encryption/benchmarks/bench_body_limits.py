@@ -0,0 +1,151 @@
+"""
+Request body limits through a local uvicorn server
+Streams bodies (chunked, without Content-Length) at EncryptionMiddleware and checks that every
+oversize body is answered with 413, whether the middleware (JSON) or the route (anything else)
+is reading it, and that no error reaches the app's exception handlers or the server log.
+Also reports how many bytes the route read before the limit stopped it.
+
+Exits non-zero on any failure.
+
+Usage (from backend-encryption/):
+    python -m benchmarks.bench_body_limits --chunk-kb 600
+"""
+
+import argparse
+import http.client
+import logging
+import socket
+import sys
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.middleware.encryption_middleware import EncryptionMiddleware
+from app.utils.encryption import EncryptionConfig
+
+LIMIT = EncryptionConfig.MAX_BODY_SIZE
+
+
+class ErrorCounter(logging.Handler):
+    """Counts ERROR records (e.g. uvicorn's "Exception in ASGI application")"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.records = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+def build_app(read: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        read["bytes"] = 0
+        async for chunk in request.stream():
+            read["bytes"] += len(chunk)
+        return {"received": read["bytes"]}
+
+    @app.post("/upload-handled")
+    async def upload_handled(request: Request):
+        # Routes that turn read errors into their own response must not hide the 413
+        try:
+            body = await request.body()
+        except Exception:
+            return JSONResponse(status_code=400, content={"detail": "Could not read body"})
+        return {"received": len(body)}
+
+    @app.post("/items")
+    async def items(request: Request):
+        return {"received": len(await request.body())}
+
+    app.add_middleware(EncryptionMiddleware)
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def post(port: int, path: str, content_type: str, chunks: list, content_length: bool = False) -> int:
+    """POST a body in chunks (chunked transfer encoding unless content_length) and return the status"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+
+    def body():
+        for chunk in chunks:
+            yield chunk
+            time.sleep(0.02)  # Let the server read each chunk on its own
+
+    headers = {"Content-Type": content_type}
+    try:
+        if content_length:
+            headers["Content-Length"] = str(sum(len(chunk) for chunk in chunks))
+            conn.request("POST", path, body=b"".join(chunks), headers=headers)
+        else:
+            conn.request("POST", path, body=body(), headers=headers, encode_chunked=True)
+    except ConnectionError:
+        pass  # The server may answer and close before the whole body is sent
+    try:
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+
+def main(chunk_size: int) -> bool:
+    read = {"bytes": 0}
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(build_app(read), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    oversize = [b"a" * chunk_size] * (LIMIT // chunk_size + 1)
+    within = [b"a" * chunk_size] * max(LIMIT // chunk_size, 1)
+    json_oversize = [b'{"data": "'] + oversize + [b'"}']
+    cases = [
+        ("chunked octet-stream, route streams", "/upload", "application/octet-stream", oversize, False, 413),
+        ("chunked octet-stream, route handles", "/upload-handled", "application/octet-stream", oversize, False, 413),
+        ("chunked JSON, middleware reads", "/items", "application/json", json_oversize, False, 413),
+        ("Content-Length over the limit", "/upload", "application/octet-stream", oversize, True, 413),
+        ("chunked octet-stream within limit", "/upload", "application/octet-stream", within, False, 200),
+    ]
+
+    failures = []
+    print(f"Limit: {LIMIT} bytes, {chunk_size}-byte chunks")
+    try:
+        for name, path, content_type, chunks, content_length, expected in cases:
+            read["bytes"] = 0
+            logged = len(errors.records)
+            start = time.perf_counter()
+            status = post(port, path, content_type, chunks, content_length)
+            elapsed = (time.perf_counter() - start) * 1000
+            new_errors = len(errors.records) - logged
+            print(
+                f"{name:<38} {status} (expected {expected})  "
+                f"route read {read['bytes']:>8} bytes  {elapsed:6.1f} ms  errors logged: {new_errors}"
+            )
+            if status != expected or new_errors:
+                failures.append(name)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    print("PASS" if not failures else f"FAIL {', '.join(failures)}")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-kb", type=int, default=600, help="Size of each streamed chunk in KB")
+    args = parser.parse_args()
+    sys.exit(0 if main(args.chunk_kb * 1000) else 1)
@@ -0,0 +1,108 @@
+"""
+Allocation and latency of the request/response encryption path for 1 KB - 10 MB payloads
+Uses tracemalloc to report the peak bytes allocated per request above the live payload, for the
+dict-based helpers (json.loads -> encrypt_response -> json.dumps, as the middleware used to do)
+and for the byte-oriented path the middleware uses now (encrypt_body / decrypt_body)
+
+The same envelope is decrypted repeatedly, so timestamp and replay checks are off.
+
+Usage (from backend-encryption/):
+    python -m benchmarks.bench_buffers --sizes 1K,10K,100K,1M,10M
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from app.utils.encryption import EncryptionConfig, decrypt_body, decrypt_data, encrypt_body, encrypt_response
+
+SIZE_UNITS = {"K": 1024, "M": 1024 * 1024}
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().upper()
+    if value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def build_body(size: int) -> bytes:
+    """JSON response body of roughly `size` bytes"""
+    item = {"content_id": "content-000000", "title": "Morning Meditation", "progress": 42, "completed": False}
+    item_size = len(json.dumps(item)) + 2
+    items = [dict(item, content_id=f"content-{i:06d}") for i in range(max(size // item_size, 1))]
+    return json.dumps({"user_id": "user123", "items": items}).encode()
+
+
+# Dict-based helpers (what the middleware did before the byte path existed)
+
+def dict_response_path(body: bytes) -> bytes:
+    return json.dumps(encrypt_response(json.loads(body))).encode()
+
+
+def dict_request_path(request_body: bytes) -> bytes:
+    return json.dumps(decrypt_data(json.loads(request_body)["payload"], check_timestamp=False)).encode()
+
+
+# Byte-oriented path
+
+def body_response_path(body: bytes) -> bytes:
+    return encrypt_body(body)
+
+
+def body_request_path(request_body: bytes) -> bytes:
+    return decrypt_body(json.loads(request_body)["payload"], check_timestamp=False)
+
+
+def measure(fn, arg, iterations: int):
+    """Return (peak bytes allocated during one call, median seconds per call)"""
+    fn(arg)  # Warm caches (derived keys, scratch buffers)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return peak - baseline, timings[len(timings) // 2]
+
+
+def main(sizes, iterations: int) -> None:
+    # Allow 10 MB envelopes for the benchmark
+    EncryptionConfig.MAX_BODY_SIZE = max(sizes) * 2
+
+    paths = [
+        ("dict", dict_response_path, dict_request_path),
+        ("body", body_response_path, body_request_path),
+    ]
+
+    print(f"{'payload':>9} {'path':<5} {'response peak':>14} {'x':>5} {'ms':>8}   {'request peak':>13} {'x':>5} {'ms':>8}")
+    for size in sizes:
+        body = build_body(size)
+        request_body = dict_response_path(body)
+        for name, response_path, request_path in paths:
+            response_peak, response_time = measure(response_path, body, iterations)
+            request_peak, request_time = measure(request_path, request_body, iterations)
+            print(
+                f"{len(body) / 1024:>8.0f}K {name:<5} "
+                f"{response_peak / 1024:>12.0f}KB {response_peak / len(body):>5.1f} {response_time * 1000:>8.2f}   "
+                f"{request_peak / 1024:>11.0f}KB {request_peak / len(body):>5.1f} {request_time * 1000:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1K,10K,100K,1M,10M", help="Comma-separated payload sizes")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed calls per size and path")
+    args = parser.parse_args()
+    main([parse_size(size) for size in args.sizes.split(",")], args.iterations)
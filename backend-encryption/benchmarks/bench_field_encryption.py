@@ -0,0 +1,126 @@
+"""
+Benchmark field-level vs whole-body response encryption
+Compares bytes encrypted, output size and latency for a large /profile-style document, then
+checks that EncryptionMiddleware rejects malformed specs at startup and answers 500 (never the
+plaintext) when a field route's body cannot be field-encrypted. Exits non-zero if a check fails.
+
+Usage (from backend-encryption/):
+    python -m benchmarks.bench_field_encryption --history 1000 --iterations 50
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from fastapi import FastAPI
+from starlette.responses import Response
+
+from app.middleware.encryption_middleware import EncryptionMiddleware
+from app.utils.encryption import encrypt_data
+from app.utils.field_encryption import FIELD_TOKEN_PREFIX, FieldPathError, encrypt_fields
+from app.utils.metrics import encryption_metrics
+from benchmarks.bench_health import get
+
+# Fields that actually need to be secret in a /profile response
+PROFILE_FIELD_SPEC = [
+    "$.access_token",
+    "$.refresh_token",
+    "$.payment.*",
+]
+
+
+def build_profile(history_items: int) -> dict:
+    """Build a /profile-style document with a few secrets and a lot of plain data"""
+    return {
+        "id": "user123",
+        "email": "user@example.com",
+        "name": "John Doe",
+        "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "a" * 200,
+        "refresh_token": "r" * 64,
+        "payment": {"card_last4": "4242", "card_token": "tok_" + "x" * 24, "billing_zip": "94107"},
+        "preferences": {"theme": "dark", "notifications": True, "language": "en"},
+        "history": [
+            {"content_id": f"content-{i}", "title": f"Morning Meditation {i}", "progress": i % 100, "completed": i % 3 == 0}
+            for i in range(history_items)
+        ],
+    }
+
+
+def run(label: str, fn, document: dict, iterations: int) -> None:
+    encryption_metrics.reset()
+    fn(document)  # warm up
+
+    encryption_metrics.reset()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        output = fn(document)
+    elapsed = time.perf_counter() - start
+
+    bytes_encrypted = encryption_metrics.get("encrypt.bytes") // iterations
+    output_size = len(json.dumps(output))
+    print(
+        f"{label:<14} {elapsed / iterations * 1000:9.3f} ms/op "
+        f"{bytes_encrypted:>10} bytes encrypted "
+        f"{output_size:>10} bytes out"
+    )
+
+
+async def check_middleware(document: dict) -> list:
+    """Return the names of failed field-mode checks"""
+    failures = []
+
+    try:
+        EncryptionMiddleware(FastAPI(), field_encryption_specs={"/profile": ["access_token"]})
+        failures.append("malformed spec accepted")
+    except FieldPathError as e:
+        print(f"malformed spec rejected: {e}")
+
+    app = FastAPI()
+
+    @app.get("/profile")
+    async def profile():
+        return document
+
+    @app.get("/profile/broken")
+    async def broken():
+        # Labelled JSON but truncated, so the fields cannot be located
+        return Response(json.dumps(document).encode()[:200], media_type="application/json")
+
+    app.add_middleware(EncryptionMiddleware, field_encryption_specs={"/profile": PROFILE_FIELD_SPEC})
+
+    status, body = await get(app, "/profile")
+    print(f"GET /profile          {status}")
+    if status != 200 or not body.get("access_token", "").startswith(FIELD_TOKEN_PREFIX):
+        failures.append("fields not encrypted")
+
+    try:
+        status, body = await get(app, "/profile/broken")
+    except ValueError:
+        status, body = None, "the truncated plaintext"  # Sent as-is, so not parseable
+    print(f"GET /profile/broken   {status}")
+    if status != 500 or document["access_token"] in json.dumps(body):
+        failures.append("plaintext sent after a field encryption failure")
+
+    return failures
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, default=1000, help="History entries in the profile document")
+    parser.add_argument("--iterations", type=int, default=50, help="Encryptions per mode")
+    args = parser.parse_args()
+
+    document = build_profile(args.history)
+    print(f"Document: {len(json.dumps(document))} bytes, field spec: {PROFILE_FIELD_SPEC}")
+    run("whole-body", encrypt_data, document, args.iterations)
+    run("field-level", lambda doc: encrypt_fields(doc, PROFILE_FIELD_SPEC), document, args.iterations)
+
+    failures = asyncio.run(check_middleware(document))
+    print("PASS" if not failures else f"FAIL {', '.join(failures)}")
+    return not failures
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
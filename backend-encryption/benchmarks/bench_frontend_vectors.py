@@ -0,0 +1,152 @@
+"""
+Frontend-compatibility and performance-regression check for decrypt_data
+Decrypts the committed envelopes produced by the browser client's algorithm
+(benchmarks/vectors/frontend_envelopes.jsonl, see generate_frontend_vectors.mjs), verifies every
+plaintext, checks tampered envelopes are rejected for the right reason, and enforces a time
+budget per size class in the same run. Exits non-zero on any failure.
+
+Usage (from backend-encryption/):
+    python -m benchmarks.bench_frontend_vectors
+    python -m benchmarks.bench_frontend_vectors --budget-scale 3   # slower CI machines
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+from app.utils.bulk_encryption import use_keys
+from app.utils.encryption import (
+    DecryptionError,
+    EncryptionConfig,
+    EnvelopeValidationError,
+    SignatureVerificationError,
+    decrypt_data,
+)
+
+VECTORS_PATH = os.path.join(os.path.dirname(__file__), "vectors", "frontend_envelopes.jsonl")
+
+# Median decrypt_data time per vector in milliseconds once the salt's key is
+# cached (envelope checks, HMAC, base64, AEAD and JSON parsing). Set to about
+# twice the times measured when the vectors were added; large classes are
+# dominated by json.loads of the plaintext
+BUDGETS_MS = {
+    "tiny": 0.1,
+    "small": 0.2,
+    "medium": 1.5,
+    "large": 6.0,
+    "xlarge": 25.0,
+    "tampered": 0.1,  # Rejections, including AEAD failures with a cached key
+}
+
+# First decrypt of a new salt (one PBKDF2 run at the vectors' iteration count)
+KDF_BUDGET_MS = 80.0
+
+
+def canonical_sha256(data: Any) -> str:
+    """Hash of the sorted, whitespace-free JSON form (matches the generator's canonicalJson)"""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def rejection_reason(payload: Dict[str, Any]) -> str:
+    """Decrypt an envelope that must fail and name the check that rejected it"""
+    try:
+        decrypt_data(payload, check_timestamp=False)
+    except EnvelopeValidationError as e:
+        return e.reason
+    except SignatureVerificationError:
+        return "signature"
+    except DecryptionError:
+        return "aead"
+    return "accepted"
+
+
+def timed_ms(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def load_vectors(path: str):
+    with open(path) as f:
+        header = json.loads(f.readline())
+        vectors = [json.loads(line) for line in f if line.strip()]
+    return header, vectors
+
+
+def run(path: str, repeat: int, budget_scale: float) -> bool:
+    header, vectors = load_vectors(path)
+    failures: List[str] = []
+    warm_ms: Dict[str, List[float]] = {}
+    kdf_ms: List[float] = []
+
+    EncryptionConfig.PBKDF2_ITERATIONS = header["pbkdf2_iterations"]
+
+    with use_keys(header["encryption_key"], header["hmac_key"]):
+        for vector in vectors:
+            payload = vector["payload"]
+            decrypt = lambda: decrypt_data(payload, check_timestamp=False)  # noqa: E731
+
+            if vector["class"] == "tampered":
+                reason = rejection_reason(payload)
+                if reason != vector["reject"]:
+                    failures.append(f"{vector['id']}: expected rejection '{vector['reject']}', got '{reason}'")
+                samples = [timed_ms(rejection_reason, payload) for _ in range(repeat)]
+                warm_ms.setdefault("tampered", []).append(statistics.median(samples))
+                continue
+
+            # Correctness (the first call also pays for key derivation)
+            try:
+                start = time.perf_counter()
+                data = decrypt()
+                cold = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                failures.append(f"{vector['id']}: {type(e).__name__}: {e}")
+                continue
+
+            if canonical_sha256(data) != vector["plaintext_sha256"]:
+                failures.append(f"{vector['id']}: plaintext hash mismatch")
+            elif "plaintext" in vector and data != vector["plaintext"]:
+                failures.append(f"{vector['id']}: plaintext mismatch")
+
+            samples = [timed_ms(decrypt) for _ in range(repeat)]
+            warm = statistics.median(samples)
+            warm_ms.setdefault(vector["class"], []).append(warm)
+            kdf_ms.append(cold - warm)
+
+    print(f"{len(vectors)} vectors from {header['source']} (generated {header['generated_at']})")
+    print(f"{'class':<10} {'vectors':>7} {'median ms':>10} {'budget ms':>10}")
+    for vector_class, budget in BUDGETS_MS.items():
+        if vector_class not in warm_ms:
+            continue
+        median = statistics.median(warm_ms[vector_class])
+        budget *= budget_scale
+        status = "ok" if median <= budget else "OVER BUDGET"
+        print(f"{vector_class:<10} {len(warm_ms[vector_class]):>7} {median:>10.3f} {budget:>10.3f}  {status}")
+        if median > budget:
+            failures.append(f"{vector_class}: median {median:.3f}ms exceeds budget {budget:.3f}ms")
+
+    kdf_median = statistics.median(kdf_ms) if kdf_ms else 0.0
+    kdf_budget = KDF_BUDGET_MS * budget_scale
+    print(f"{'kdf':<10} {len(kdf_ms):>7} {kdf_median:>10.3f} {kdf_budget:>10.3f}  {'ok' if kdf_median <= kdf_budget else 'OVER BUDGET'}")
+    if kdf_median > kdf_budget:
+        failures.append(f"kdf: median {kdf_median:.3f}ms exceeds budget {kdf_budget:.3f}ms")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("PASS" if not failures else f"{len(failures)} failure(s)")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", default=VECTORS_PATH, help="Vector file (JSON Lines)")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed decrypts per vector")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget (slower machines)")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.vectors, args.repeat, args.budget_scale) else 1)
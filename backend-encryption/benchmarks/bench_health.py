@@ -0,0 +1,185 @@
+"""
+Cost of health-check polling and readiness under load
+1. Latency of /health built per request (the previous handler: warm-up status, metrics and
+   JSONResponse on every poll) vs the readiness monitor's cached snapshot, through the app
+   with the security pipeline, and each one's cost over /noop (an empty response)
+2. /ready while the worker is saturated: event-loop blocking, a full thread pool queue and a
+   saturated DB pool must each turn it to 503 with the matching reason, and back to 200 after
+Exits non-zero if a saturation check does not show up, or if /health or /ready expose
+measurements that belong to /health/details.
+
+Usage (from backend-encryption/):
+    python -m benchmarks.bench_health --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import anyio.to_thread
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.responses import Response
+
+from app.middleware.security_pipeline import SecurityPipelineMiddleware
+from app.routes import health
+from app.utils.encryption import EncryptionConfig
+from app.utils.metrics import encryption_metrics
+from app.utils.readiness import ReadinessConfig, readiness_monitor
+from app.utils.warmup import get_warmup_status, warm_up
+from benchmarks.bench_security_pipeline import call
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/noop")
+    async def noop():
+        return Response(b"{}", media_type="application/json")
+
+    @app.get("/health-uncached")
+    async def health_uncached():
+        warmup = get_warmup_status()
+        return JSONResponse(status_code=200 if warmup["ready"] else 503, content={
+            "status": "healthy" if warmup["ready"] else "starting",
+            "ready": warmup["ready"],
+            "warmup": warmup,
+            "encryption_enabled": EncryptionConfig.ENCRYPTION_ENABLED,
+            "encryption_algorithm": EncryptionConfig.ALGORITHM,
+            "encryption_algorithm_benchmark": EncryptionConfig.ALGORITHM_BENCHMARK,
+            "encryption_metrics": encryption_metrics.snapshot(),
+        })
+
+    app.include_router(health.router)
+    app.add_middleware(SecurityPipelineMiddleware, public_endpoints=["/health", "/ready", "/health-uncached"])
+    return app
+
+
+async def get(app, path: str, headers: tuple = ()):
+    """GET a path through the ASGI app and return (status, parsed JSON body)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"localhost"), *headers], "client": ("127.0.0.1", 50000),
+    }
+    response = {"body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], json.loads(response["body"])
+
+
+async def wait_for_reason(app, reason: str, present: bool, timeout: float = 5.0) -> bool:
+    """Poll /ready until a reason appears (or clears)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, body = await get(app, "/ready")
+        if (reason in body["reasons"]) == present and (status == 503) == present:
+            return True
+        await asyncio.sleep(ReadinessConfig.SNAPSHOT_INTERVAL / 4)
+    return False
+
+
+async def main(requests: int) -> bool:
+    ReadinessConfig.SNAPSHOT_INTERVAL = 0.2
+    ReadinessConfig.DETAILS_TOKEN = "bench-token"
+    failures = []
+    warm_up(select_algorithm=False)
+    app = build_app()
+    await readiness_monitor.start(service="bench")
+
+    # 1. Polling cost
+    latencies = {}
+    for path in ("/noop", "/health-uncached", "/health", "/ready"):
+        for _ in range(100):
+            await call(app, "GET", path, [])
+        start = time.perf_counter()
+        for _ in range(requests):
+            await call(app, "GET", path, [])
+        latencies[path] = (time.perf_counter() - start) / requests * 1e6
+        print(
+            f"GET {path:<17} {latencies[path]:8.1f} us/request "
+            f"({latencies[path] - latencies['/noop']:+6.1f} over /noop)"
+        )
+
+    # Public bodies carry the status (and /health the default AEAD); measurements need the details token
+    public_fields = {
+        "/health": {"service", "status", "ready", "reasons", "encryption_algorithm"},
+        "/ready": {"status", "ready", "reasons"},
+    }
+    for path, fields in public_fields.items():
+        status, body = await get(app, path)
+        if path == "/health" and body.get("encryption_algorithm") != EncryptionConfig.ALGORITHM:
+            failures.append("/health does not report the default algorithm")
+        exposed = set(body) - fields
+        if exposed:
+            failures.append(f"{path} exposes {', '.join(sorted(exposed))}")
+    status, body = await get(app, "/health/details")
+    if status != 404:
+        failures.append("/health/details served without its token")
+    token = ReadinessConfig.DETAILS_TOKEN.encode()
+    status, body = await get(app, "/health/details", ((b"x-health-token", token),))
+    print(f"self-test {body['self_test']['duration_ms']} ms: {body['self_test']['timings_ms']}")
+
+    # 2. Saturation
+    async def check(name: str, reason: str, saturate, release) -> None:
+        await saturate()
+        detected = await wait_for_reason(app, reason, True)
+        await release()
+        cleared = await wait_for_reason(app, reason, False)
+        print(f"{name:<28} detected: {detected}  cleared: {cleared}")
+        if not (detected and cleared):
+            failures.append(name)
+
+    async def block_loop():
+        # Block the loop repeatedly, as a CPU-bound handler would
+        for _ in range(3):
+            time.sleep(ReadinessConfig.MAX_LOOP_LAG_MS * 2 / 1000)
+            await asyncio.sleep(0.05)
+
+    async def nothing():
+        pass
+
+    await check("event loop blocked", "event_loop_lag", block_loop, nothing)
+
+    async def fill_threads():
+        # Sleeping calls release the threads on their own after a few intervals
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        for _ in range(limiter.total_tokens + ReadinessConfig.MAX_THREAD_QUEUE + 5):
+            asyncio.get_running_loop().create_task(
+                anyio.to_thread.run_sync(time.sleep, ReadinessConfig.SNAPSHOT_INTERVAL * 4)
+            )
+
+    await check("thread pool queue", "thread_pool_queue", fill_threads, nothing)
+
+    pool = {"in_use": 0}
+    readiness_monitor.register_pool("database", lambda: (pool["in_use"], 20))
+
+    async def saturate_pool():
+        pool["in_use"] = 20
+
+    async def release_pool():
+        pool["in_use"] = 3
+
+    await check("database pool saturated", "pool_saturated:database", saturate_pool, release_pool)
+
+    await readiness_monitor.stop()
+    print("PASS" if not failures else f"FAIL {', '.join(failures)}")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.requests)) else 1)
@@ -0,0 +1,121 @@
+"""
+Throughput benchmark for local media streaming
+Runs a local uvicorn server and compares MediaFileResponse against Starlette's FileResponse
+
+Usage (from backend-encryption/):
+    python -m benchmarks.bench_media_streaming --size-mb 64 --requests 20
+"""
+
+import argparse
+import http.client
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _fetch(port: int, path: str, headers: dict) -> int:
+    """Fetch a URL and return the number of body bytes received"""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    try:
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        received = 0
+        while True:
+            chunk = response.read(1024 * 1024)
+            if not chunk:
+                break
+            received += len(chunk)
+        return received
+    finally:
+        conn.close()
+
+
+def _run(label: str, port: int, path: str, requests: int, headers_factory) -> None:
+    total = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        total += _fetch(port, path, headers_factory())
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<32} {requests / elapsed:8.1f} req/s "
+        f"{total / elapsed / (1024 * 1024):9.1f} MB/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=64, help="Size of the test media file")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    args = parser.parse_args()
+
+    media_root = tempfile.mkdtemp(prefix="media-bench-")
+    file_name = "bench.mp4"
+    file_size = args.size_mb * 1024 * 1024
+    with open(os.path.join(media_root, file_name), "wb") as f:
+        f.write(os.urandom(file_size))
+
+    # MediaConfig reads the environment at import time
+    os.environ["MEDIA_ROOT"] = media_root
+
+    import uvicorn
+    from fastapi import FastAPI
+    from starlette.responses import FileResponse
+
+    from app.middleware.encryption_middleware import EncryptionMiddleware, SecurityHeadersMiddleware
+    from app.routes import media
+
+    app = FastAPI()
+    app.add_middleware(EncryptionMiddleware)
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.include_router(media.router, prefix=media.MediaConfig.ROUTE_PREFIX)
+
+    @app.get("/baseline/{name}")
+    async def baseline(name: str):
+        return FileResponse(os.path.join(media_root, name))
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    media_path = f"{media.MediaConfig.ROUTE_PREFIX}/{file_name}"
+    baseline_path = f"/baseline/{file_name}"
+
+    def no_headers() -> dict:
+        return {}
+
+    def seek_range() -> dict:
+        start = random.randrange(0, file_size - 1024 * 1024)
+        return {"Range": f"bytes={start}-{start + 1024 * 1024 - 1}"}
+
+    def multi_range() -> dict:
+        starts = sorted(random.sample(range(0, file_size - 65536, 65536), 4))
+        return {"Range": "bytes=" + ",".join(f"{s}-{s + 65535}" for s in starts)}
+
+    print(f"File: {args.size_mb} MB, {args.requests} requests per scenario")
+    try:
+        _run("baseline FileResponse (full)", port, baseline_path, args.requests, no_headers)
+        _run("media (full)", port, media_path, args.requests, no_headers)
+        _run("baseline FileResponse (1MB seek)", port, baseline_path, args.requests * 10, seek_range)
+        _run("media (1MB seek)", port, media_path, args.requests * 10, seek_range)
+        _run("media (4x64KB multi-range)", port, media_path, args.requests * 10, multi_range)
+    finally:
+        server.should_exit = True
+        thread.join()
+        os.remove(os.path.join(media_root, file_name))
+        os.rmdir(media_root)
+
+
+if __name__ == "__main__":
+    main()
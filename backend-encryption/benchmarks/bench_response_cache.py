@@ -0,0 +1,68 @@
+"""
+Benchmark the per-user response cache on an encrypted GET route
+Simulates a /profile handler that waits on the database and compares latency and handler calls
+with the cache disabled and enabled (every response is still encrypted with a fresh IV)
+
+Usage (from backend-encryption/):
+    python -m benchmarks.bench_response_cache --requests 2000 --users 50 --db-latency-ms 2
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from app.middleware.security_pipeline import SecurityPipelineMiddleware
+from app.utils.encryption import EncryptionConfig
+from app.utils.response_cache import ResponseCache
+from benchmarks.bench_security_pipeline import call
+
+
+def build_app(ttl: float, db_latency: float, calls: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/profile")
+    async def profile():
+        calls["handler"] += 1
+        await asyncio.sleep(db_latency)
+        return {
+            "id": "user123",
+            "email": "user@example.com",
+            "preferences": {"theme": "dark", "notifications": True},
+            "history": [{"content_id": f"content-{i}", "progress": i} for i in range(50)],
+        }
+
+    app.add_middleware(SecurityPipelineMiddleware, cache=ResponseCache(ttl=ttl))
+    return app
+
+
+async def run(ttl: float, requests: int, users: int, db_latency: float) -> None:
+    calls = {"handler": 0}
+    app = build_app(ttl, db_latency, calls)
+
+    start = time.perf_counter()
+    for i in range(requests):
+        headers = [(b"authorization", f"Bearer user-{i % users}".encode())]
+        await call(app, "GET", "/profile", headers)
+    elapsed = time.perf_counter() - start
+
+    label = f"cache ttl={ttl:g}s" if ttl else "cache disabled"
+    print(
+        f"{label:<16} {elapsed / requests * 1e3:6.2f} ms/request, "
+        f"{calls['handler']:>5} handler calls for {requests} requests"
+    )
+
+
+async def main(requests: int, users: int, db_latency_ms: float) -> None:
+    for ttl in (0, EncryptionConfig.RESPONSE_CACHE_TTL):
+        await run(ttl, requests, users, db_latency_ms / 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50, help="Distinct users (Authorization headers)")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="Simulated database time per handler call")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.users, args.db_latency_ms))
@@ -0,0 +1,124 @@
+"""
+Per-request overhead of the security middleware stack
+Calls the ASGI app directly (no server, no HTTP client) and reports microseconds per request
+above a bare app, for the layered stack (EncryptionMiddleware + SecurityHeadersMiddleware +
+CORSMiddleware) and for the single-pass SecurityPipelineMiddleware
+
+Usage (from backend-encryption/):
+    python -m benchmarks.bench_security_pipeline --requests 5000
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.middleware.encryption_middleware import EncryptionMiddleware, SecurityHeadersMiddleware
+from app.middleware.security_pipeline import SecurityPipelineMiddleware
+
+ORIGINS = ["https://betterandbliss.com", "http://localhost:5173"]
+ORIGIN = b"https://betterandbliss.com"
+
+SCENARIOS = {
+    "GET /content (plain JSON)": ("GET", "/content", [(b"origin", ORIGIN)]),
+    "GET /profile (encrypted)": ("GET", "/profile", [(b"origin", ORIGIN), (b"authorization", b"Bearer token")]),
+    "OPTIONS /profile (preflight)": ("OPTIONS", "/profile", [
+        (b"origin", ORIGIN),
+        (b"access-control-request-method", b"POST"),
+        (b"access-control-request-headers", b"content-type"),
+    ]),
+}
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/content")
+    async def content():
+        return {"items": [{"id": i, "title": f"Meditation {i}"} for i in range(10)]}
+
+    @app.get("/profile")
+    async def profile():
+        return {"id": "user123", "email": "user@example.com", "name": "John Doe"}
+
+    if stack == "layered":
+        app.add_middleware(EncryptionMiddleware)
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=ORIGINS,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+    elif stack == "pipeline":
+        app.add_middleware(SecurityPipelineMiddleware, cors_origins=ORIGINS)
+
+    return app
+
+
+async def call(app, method: str, path: str, headers: list) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"api.betterandbliss.com")] + headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("api.betterandbliss.com", 443),
+    }
+    request_sent = False
+    status = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # Client never disconnects
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, method: str, path: str, headers: list, requests: int) -> float:
+    for _ in range(50):
+        await call(app, method, path, headers)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, method, path, headers)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int) -> None:
+    apps = {stack: build_app(stack) for stack in ("bare", "layered", "pipeline")}
+
+    print(f"{'scenario':<30} {'bare':>9} {'layered':>16} {'pipeline':>16}")
+    for name, (method, path, headers) in SCENARIOS.items():
+        timings = {stack: await measure(app, method, path, headers, requests) for stack, app in apps.items()}
+        bare = timings["bare"]
+        print(
+            f"{name:<30} {bare:7.1f}us "
+            f"{timings['layered']:7.1f}us (+{timings['layered'] - bare:5.1f}) "
+            f"{timings['pipeline']:7.1f}us (+{timings['pipeline'] - bare:5.1f})"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per scenario and stack")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,187 @@
+"""
+Stress test for the host-wide shared state (app.utils.shared_state) with 4-16 worker processes
+Workers are spawned like uvicorn's (fresh interpreters attaching to the segments by name) and,
+for each process count:
+- replay: every worker decrypts the same envelopes through decrypt_data in its own order;
+  each envelope must be accepted by exactly one worker
+- counters: every worker consumes tokens from the same shared failure-limiter buckets;
+  no update may be lost
+- invalidations: every worker caches responses for the same users, then each invalidates
+  a share of them; no worker may serve an invalidated entry, and the rest must still hit
+- throughput: aggregate ReplayCache.add operations per second with all workers busy
+Exits non-zero on any failure. Segments are created under a unique name and unlinked afterwards.
+
+Usage (from backend-encryption/):
+    python -m benchmarks.stress_shared_state --processes 4,8,16 --envelopes 2000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, List
+
+# Limiter buckets hit by every worker in the counters phase
+COUNTER_KEYS = [f"client-{i}" for i in range(64)]
+
+# Users with cached responses in the invalidations phase
+CACHE_USERS = [f"user-{i}" for i in range(256)]
+
+
+def worker(
+    index: int, processes: int, envelopes: List[Dict[str, Any]], consumes: int, adds: int, barrier, results
+) -> None:
+    """Run the three phases in one spawned process and report back"""
+    from app.middleware.encryption_middleware import EncryptionMiddleware
+    from app.utils.encryption import DecryptionError, decrypt_data, get_replay_cache
+    from app.utils.metrics import encryption_metrics
+    from app.utils.response_cache import CachedResponse, response_cache
+
+    replay_cache = get_replay_cache()
+    failure_limiter = EncryptionMiddleware(None).failure_limiter
+    rng = random.Random(index)
+    report: Dict[str, Any] = {
+        "shared": replay_cache.is_shared and failure_limiter.is_shared and response_cache.invalidations.enabled,
+    }
+
+    # Replay: same envelopes, different order in every worker
+    order = list(range(len(envelopes)))
+    rng.shuffle(order)
+    accepted, replays = [], 0
+    barrier.wait()
+    for i in order:
+        try:
+            decrypt_data(envelopes[i])
+            accepted.append(i)
+        except DecryptionError as e:
+            if getattr(e, "reason", None) != "replay":
+                raise
+            replays += 1
+    report.update(accepted=accepted, replays=replays)
+
+    # Counters: interleaved consumes on shared buckets
+    barrier.wait()
+    for n in range(consumes):
+        failure_limiter.consume(COUNTER_KEYS[(n + index) % len(COUNTER_KEYS)])
+
+    # Invalidations: worker i invalidates every processes-th user; /subscription is left alone
+    entry = CachedResponse(status_code=200, raw_headers=[], body=b"{}", etag='W/"x"')
+    generation = response_cache.generation()
+    for user in CACHE_USERS:
+        for route in ("/profile", "/subscription"):
+            response_cache.set(route, user, entry, generation)
+    barrier.wait()
+    for user in CACHE_USERS[index::processes]:
+        response_cache.invalidate(user, "/profile")
+    barrier.wait()
+    report["stale"] = sum(response_cache.get("/profile", user) is not None for user in CACHE_USERS)
+    report["kept"] = sum(response_cache.get("/subscription", user) is not None for user in CACHE_USERS)
+
+    # Throughput: unique IDs, all workers at once
+    ids = [os.urandom(32) for _ in range(adds)]
+    expires_at = int(time.time() * 1000) + 60_000
+    barrier.wait()
+    start = time.perf_counter()
+    for replay_id in ids:
+        replay_cache.add(replay_id, expires_at)
+    report["add_seconds"] = time.perf_counter() - start
+    report["evictions"] = encryption_metrics.get("shared_state.evictions.ReplayCache")
+
+    results.put((index, report))
+
+
+def run(processes: int, envelope_count: int, consumes: int, adds: int) -> List[str]:
+    """Run one process count and return the failures"""
+    from app.middleware.encryption_middleware import EncryptionMiddleware
+    from app.utils.encryption import EncryptionConfig, encrypt_data, get_replay_cache
+    from app.utils.shared_state import unlink_tables
+
+    # Fresh segments for this run; spawned workers read the name from the environment
+    consumes -= consumes % len(COUNTER_KEYS)
+    name = f"api-encryption-stress-{uuid.uuid4().hex[:8]}"
+    os.environ["API_SHARED_STATE_NAME"] = name
+    os.environ["API_DECRYPTION_FAILURE_REFILL_PER_SECOND"] = "0"
+    capacity = processes * consumes // len(COUNTER_KEYS) + 1
+    os.environ["API_DECRYPTION_FAILURE_BURST"] = str(capacity)
+    EncryptionConfig.SHARED_STATE_NAME = name
+    EncryptionConfig.DECRYPTION_FAILURE_BURST = capacity
+    EncryptionConfig.DECRYPTION_FAILURE_REFILL_PER_SECOND = 0
+    get_replay_cache.cache_clear()
+
+    envelopes = [encrypt_data({"n": i, "pad": "x" * 64}) for i in range(envelope_count)]
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [
+        context.Process(target=worker, args=(i, processes, envelopes, consumes, adds, barrier, results))
+        for i in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    reports = dict(results.get(timeout=300) for _ in workers)
+    for process in workers:
+        process.join()
+
+    failures = []
+    if not all(report["shared"] for report in reports.values()):
+        failures.append("a worker fell back to per-worker tables")
+
+    # Replay: exactly one acceptance per envelope across all workers
+    acceptances = [0] * envelope_count
+    for report in reports.values():
+        for i in report["accepted"]:
+            acceptances[i] += 1
+    duplicated = sum(1 for count in acceptances if count > 1)
+    missing = sum(1 for count in acceptances if count == 0)
+    if duplicated or missing:
+        failures.append(f"replay: {duplicated} envelopes accepted more than once, {missing} never accepted")
+
+    # Counters: each bucket must be down to exactly one token
+    failure_limiter = EncryptionMiddleware(None).failure_limiter
+    lost = [key for key in COUNTER_KEYS if not failure_limiter.is_allowed(key) or failure_limiter.consume(key)]
+    if lost:
+        failures.append(f"counters: {len(lost)} of {len(COUNTER_KEYS)} buckets lost updates")
+
+    # Invalidations: nothing stale anywhere, untouched routes still cached everywhere
+    stale = sum(report["stale"] for report in reports.values())
+    kept = sum(report["kept"] for report in reports.values())
+    if stale or kept != processes * len(CACHE_USERS):
+        failures.append(f"invalidations: {stale} stale hits, {kept}/{processes * len(CACHE_USERS)} untouched hits")
+
+    add_rate = processes * adds / max(report["add_seconds"] for report in reports.values())
+    evictions = sum(report["evictions"] for report in reports.values())
+    print(
+        f"{processes:>3} workers  replay {sum(map(len, (r['accepted'] for r in reports.values()))):>6} accepted "
+        f"{sum(r['replays'] for r in reports.values()):>7} rejected  "
+        f"counters {len(COUNTER_KEYS) - len(lost)}/{len(COUNTER_KEYS)} exact  stale hits {stale}  "
+        f"add {add_rate:>10,.0f} ops/s  evictions {evictions}  {'ok' if not failures else 'FAIL'}"
+    )
+
+    unlink_tables(name)
+    return failures
+
+
+def main(process_counts: List[int], envelopes: int, consumes: int, adds: int) -> bool:
+    failures = []
+    for processes in process_counts:
+        failures += [f"{processes} workers: {failure}" for failure in run(processes, envelopes, consumes, adds)]
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("PASS" if not failures else f"{len(failures)} failure(s)")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", default="4,8,16", help="Comma-separated worker counts")
+    parser.add_argument("--envelopes", type=int, default=2000, help="Envelopes every worker tries to decrypt")
+    parser.add_argument("--consumes", type=int, default=6400, help="Limiter consumes per worker")
+    parser.add_argument("--adds", type=int, default=20000, help="Replay IDs added per worker in the throughput phase")
+    args = parser.parse_args()
+    ok = main([int(n) for n in args.processes.split(",")], args.envelopes, args.consumes, args.adds)
+    sys.exit(0 if ok else 1)
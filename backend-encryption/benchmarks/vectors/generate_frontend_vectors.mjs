@@ -0,0 +1,303 @@
+// benchmarks/vectors/generate_frontend_vectors.mjs - Cross-language envelope test vectors
+//
+// Produces envelopes with the browser client's algorithm (src/utils/api.encryption.ts):
+// PBKDF2-SHA256 key from a random salt, AES-256-GCM with a random 96-bit IV and a
+// 128-bit tag split off the ciphertext, and an HMAC-SHA256 signature over
+// JSON.stringify of the sorted envelope fields.
+//
+// The crypto functions below are copied from api.encryption.ts with only the
+// TypeScript types removed (Node 20's WebCrypto stands in for window.crypto).
+// Keep them in sync when the frontend changes, then regenerate:
+//
+//   node benchmarks/vectors/generate_frontend_vectors.mjs > benchmarks/vectors/frontend_envelopes.jsonl
+//
+// Output is JSON Lines: one header line with the keys, then one line per vector.
+// Plaintexts are generated from a fixed seed, so only salts, IVs and timestamps
+// change between runs.
+
+const window = globalThis;
+
+const API_ENCRYPTION_CONFIG = {
+  ALGORITHM: 'AES-GCM',
+  KEY_SIZE: 256,
+  IV_SIZE: 12,
+  TAG_SIZE: 128,
+  PBKDF2_ITERATIONS: 100000,
+  SALT_SIZE: 16,
+  ENCRYPTION_KEY: 'default-dev-key-change-in-production',
+  HMAC_KEY: 'default-hmac-key-change-in-production',
+};
+
+// ---- Copied from src/utils/api.encryption.ts --------------------------------
+
+function str2ab(str) {
+  const encoder = new TextEncoder();
+  return encoder.encode(str).buffer;
+}
+
+function ab2base64(buffer) {
+  const bytes = new Uint8Array(buffer);
+  let binary = '';
+  for (let i = 0; i < bytes.byteLength; i++) {
+    binary += String.fromCharCode(bytes[i]);
+  }
+  return btoa(binary);
+}
+
+async function deriveKey(passphrase, salt) {
+  const keyMaterial = await window.crypto.subtle.importKey(
+    'raw',
+    str2ab(passphrase),
+    'PBKDF2',
+    false,
+    ['deriveKey']
+  );
+
+  return window.crypto.subtle.deriveKey(
+    {
+      name: 'PBKDF2',
+      salt: salt,
+      iterations: API_ENCRYPTION_CONFIG.PBKDF2_ITERATIONS,
+      hash: 'SHA-256',
+    },
+    keyMaterial,
+    {
+      name: API_ENCRYPTION_CONFIG.ALGORITHM,
+      length: API_ENCRYPTION_CONFIG.KEY_SIZE,
+    },
+    false,
+    ['encrypt', 'decrypt']
+  );
+}
+
+function generateSalt() {
+  return window.crypto.getRandomValues(
+    new Uint8Array(API_ENCRYPTION_CONFIG.SALT_SIZE)
+  );
+}
+
+function generateIV() {
+  return window.crypto.getRandomValues(
+    new Uint8Array(API_ENCRYPTION_CONFIG.IV_SIZE)
+  );
+}
+
+async function encryptData(data) {
+  const jsonString = JSON.stringify(data);
+
+  const salt = generateSalt();
+  const key = await deriveKey(API_ENCRYPTION_CONFIG.ENCRYPTION_KEY, salt);
+
+  const iv = generateIV();
+
+  const encryptedBuffer = await window.crypto.subtle.encrypt(
+    {
+      name: API_ENCRYPTION_CONFIG.ALGORITHM,
+      iv: iv,
+      tagLength: API_ENCRYPTION_CONFIG.TAG_SIZE,
+    },
+    key,
+    str2ab(jsonString)
+  );
+
+  const encryptedData = encryptedBuffer.slice(0, encryptedBuffer.byteLength - 16);
+  const tag = encryptedBuffer.slice(encryptedBuffer.byteLength - 16);
+
+  const timestamp = Date.now();
+  const payload = {
+    encrypted: ab2base64(encryptedData),
+    iv: ab2base64(iv),
+    tag: ab2base64(tag),
+    salt: ab2base64(salt),
+    timestamp,
+    signature: '',
+  };
+
+  payload.signature = await signPayload(payload);
+
+  return payload;
+}
+
+async function signPayload(payload) {
+  const signatureData = {
+    encrypted: payload.encrypted,
+    iv: payload.iv,
+    salt: payload.salt,
+    tag: payload.tag,
+    timestamp: payload.timestamp,
+  };
+
+  const key = await window.crypto.subtle.importKey(
+    'raw',
+    str2ab(API_ENCRYPTION_CONFIG.HMAC_KEY),
+    {
+      name: 'HMAC',
+      hash: 'SHA-256',
+    },
+    false,
+    ['sign']
+  );
+
+  const signature = await window.crypto.subtle.sign(
+    'HMAC',
+    key,
+    str2ab(JSON.stringify(signatureData))
+  );
+
+  return ab2base64(signature);
+}
+
+// ---- Plaintexts -------------------------------------------------------------
+
+// Size classes: [name, target JSON size in bytes, vectors per class]
+const SIZE_CLASSES = [
+  ['tiny', 64, 6],
+  ['small', 1024, 6],
+  ['medium', 16 * 1024, 4],
+  ['large', 64 * 1024, 2],
+  ['xlarge', 256 * 1024, 1],
+];
+
+// Strings that exercise JSON escaping and UTF-8 (kept to values both
+// JSON.stringify and Python's json module serialise identically)
+const TRICKY_STRINGS = [
+  'plain ascii',
+  'quote " backslash \\ slash /',
+  'line\nbreak\ttab\rreturn',
+  'control \u0001\u001f chars',
+  'café naïve façade',
+  '中文 日本語 한국어',
+  'emoji 🧘‍♀️ 🌿',
+  '',
+];
+
+// Floats with exact, non-exponent decimal representations in both languages
+const FLOATS = [0.5, -12.25, 3.75, 100.125];
+
+function mulberry32(seed) {
+  return function () {
+    seed |= 0;
+    seed = (seed + 0x6d2b79f5) | 0;
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+function buildItem(random, i) {
+  const pick = (values) => values[Math.floor(random() * values.length)];
+  return {
+    id: `content-${i}`,
+    title: pick(TRICKY_STRINGS),
+    progress: Math.floor(random() * 101),
+    rating: pick(FLOATS),
+    completed: random() < 0.5,
+    tags: [pick(TRICKY_STRINGS), pick(['sleep', 'focus', 'calm'])],
+    resumed_at: random() < 0.3 ? null : Math.floor(random() * 2 ** 40),
+  };
+}
+
+function buildPlaintext(random, targetSize) {
+  const data = { user_id: 'user123', note: '', items: [] };
+  let i = 0;
+  while (JSON.stringify(data).length < targetSize) {
+    if (targetSize < 128) {
+      data.note += String.fromCharCode(97 + Math.floor(random() * 26));
+    } else {
+      data.items.push(buildItem(random, i++));
+    }
+  }
+  return data;
+}
+
+// JSON with sorted keys and no whitespace; matches Python's
+// json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+function canonicalJson(value) {
+  if (Array.isArray(value)) {
+    return `[${value.map(canonicalJson).join(',')}]`;
+  }
+  if (value !== null && typeof value === 'object') {
+    const entries = Object.keys(value).sort().map((key) => `${JSON.stringify(key)}:${canonicalJson(value[key])}`);
+    return `{${entries.join(',')}}`;
+  }
+  return JSON.stringify(value);
+}
+
+async function sha256Hex(text) {
+  const digest = await window.crypto.subtle.digest('SHA-256', str2ab(text));
+  return Buffer.from(digest).toString('hex');
+}
+
+// ---- Tampered envelopes (must be rejected) ----------------------------------
+
+function flipBase64Char(value, index) {
+  const replacement = value[index] === 'A' ? 'B' : 'A';
+  return value.slice(0, index) + replacement + value.slice(index + 1);
+}
+
+async function tamperedVectors(payload) {
+  // Ciphertext changed and re-signed: only the GCM tag can catch it
+  const ciphertextFlipped = { ...payload, encrypted: flipBase64Char(payload.encrypted, 0) };
+  ciphertextFlipped.signature = await signPayload(ciphertextFlipped);
+
+  // Tag changed and re-signed
+  const tagFlipped = { ...payload, tag: flipBase64Char(payload.tag, 0) };
+  tagFlipped.signature = await signPayload(tagFlipped);
+
+  return [
+    ['ciphertext-resigned', ciphertextFlipped, 'aead'],
+    ['tag-resigned', tagFlipped, 'aead'],
+    ['ciphertext-unsigned', { ...payload, encrypted: flipBase64Char(payload.encrypted, 0) }, 'signature'],
+    ['timestamp-unsigned', { ...payload, timestamp: payload.timestamp + 1 }, 'signature'],
+    ['signature-flipped', { ...payload, signature: flipBase64Char(payload.signature, 0) }, 'signature'],
+    ['iv-truncated', { ...payload, iv: payload.iv.slice(0, 12) }, 'length'],
+    ['salt-missing', { ...payload, salt: undefined }, 'structure'],
+  ];
+}
+
+// ---- Main ---------------------------------------------------------------------
+
+async function main() {
+  const random = mulberry32(20240601);
+  const lines = [];
+
+  lines.push(JSON.stringify({
+    format: 'frontend-envelope-vectors/v1',
+    source: 'src/utils/api.encryption.ts',
+    generated_at: new Date().toISOString(),
+    encryption_key: API_ENCRYPTION_CONFIG.ENCRYPTION_KEY,
+    hmac_key: API_ENCRYPTION_CONFIG.HMAC_KEY,
+    pbkdf2_iterations: API_ENCRYPTION_CONFIG.PBKDF2_ITERATIONS,
+  }));
+
+  let firstPayload = null;
+  for (const [sizeClass, targetSize, count] of SIZE_CLASSES) {
+    for (let n = 0; n < count; n++) {
+      const data = buildPlaintext(random, targetSize);
+      const payload = await encryptData(data);
+      firstPayload = firstPayload || payload;
+
+      const canonical = canonicalJson(data);
+      lines.push(JSON.stringify({
+        id: `${sizeClass}-${n}`,
+        class: sizeClass,
+        plaintext_bytes: str2ab(JSON.stringify(data)).byteLength,
+        plaintext_sha256: await sha256Hex(canonical),
+        // Small plaintexts are stored in full to make failures easy to read
+        plaintext: targetSize <= 1024 ? data : undefined,
+        payload,
+      }));
+    }
+  }
+
+  for (const [name, payload, reject] of await tamperedVectors(firstPayload)) {
+    lines.push(JSON.stringify({ id: `tampered-${name}`, class: 'tampered', reject, payload }));
+  }
+
+  process.stdout.write(lines.join('\n') + '\n');
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -5,23 +5,35 @@ This shows how to modify your existing app/main.py to add encryption support
 """
 
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import anyio
 import logging
+import os
 
 # Import your existing components
 # from app.routes import auth, content, streaming, newsletter
 # from app.database.connection import DatabaseConnection
 # from app.middleware.cors import setup_cors
 
-# Import encryption middleware
-from app.middleware.encryption_middleware import (
-    EncryptionMiddleware,
-    SecurityHeadersMiddleware
-)
+# Import the security pipeline (encryption + security headers + CORS in one layer)
+from app.middleware.security_pipeline import SecurityPipelineMiddleware
+
+# Import local media streaming routes (Range / 206 support) and health/readiness probes
+from app.routes import health, media
+
+# Encryption config and start-up warm-up (cryptography itself is imported lazily)
+from app.utils.encryption import EncryptionConfig
+from app.utils.readiness import readiness_monitor
+from app.utils.warmup import warm_up
 
 logger = logging.getLogger(__name__)
 
+# Pre-fork warm-up: with gunicorn --preload the app module is imported once in
+# the master, so imports, the AEAD selection and decryption keys are inherited
+# by every worker (each derives its own message key as it is forked)
+if EncryptionConfig.PREFORK_WARMUP:
+    warm_up()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -29,14 +41,25 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting Better & Bliss API with encryption support")
 
+    # Warm up encryption: derive keys, build ciphers and pick the fastest AEAD
+    # on this host (unless API_ENCRYPTION_ALGORITHM pins it). No-op if the
+    # master already did this before forking. /health reports ready afterwards.
+    timings = await anyio.to_thread.run_sync(warm_up)
+    logger.info(f"🔐 Encryption ready in {timings['total']}ms (algorithm: {EncryptionConfig.ALGORITHM})")
+
     # Initialize database (your existing code)
     # db_connection = DatabaseConnection()
     # await db_connection.connect()
+    # readiness_monitor.register_pool("database", lambda: (engine.pool.checkedout(), engine.pool.size()))
+
+    # Background crypto self-test and load sampling behind /health and /ready
+    await readiness_monitor.start(service="Better & Bliss API", version="2.0.0")
 
     yield
 
     # Shutdown
     logger.info("🛑 Shutting down Better & Bliss API")
+    await readiness_monitor.stop()
     # await db_connection.close()
 
 
@@ -52,13 +75,33 @@ app = FastAPI(
 
 
 # ==============================================
-# 1. ADD ENCRYPTION MIDDLEWARE (First!)
+# 1. SECURITY PIPELINE (encryption, security headers, CORS)
 # ==============================================
-# IMPORTANT: Add encryption middleware BEFORE CORS and other middleware
-# This ensures requests are decrypted before processing
+# One ASGI layer instead of EncryptionMiddleware + SecurityHeadersMiddleware +
+# CORSMiddleware: CORS preflights are answered here, header blocks are
+# precomputed at startup, and only requests that need encryption are buffered.
+# Don't add CORSMiddleware as well, or CORS headers are sent twice.
 
 app.add_middleware(
-    EncryptionMiddleware,
+    SecurityPipelineMiddleware,
+    # CORS
+    cors_origins=[
+        "https://betterandbliss.com",
+        "https://www.betterandbliss.com",
+        "http://localhost:5173",  # Vite dev server
+        "http://localhost:3000",  # React dev server
+    ],
+    # Optional: Per-route Content-Security-Policy (the Swagger UI loads from a CDN)
+    csp_overrides={
+        "/api/docs": (
+            "default-src 'self'; "
+            "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+            "style-src 'self' https://cdn.jsdelivr.net; "
+            "img-src 'self' data: https://fastapi.tiangolo.com; "
+            "frame-ancestors 'none'"
+        ),
+    },
+    # Encryption (passed through to EncryptionMiddleware)
     # Optional: Customize sensitive endpoints
     sensitive_endpoints=[
         "/auth/login",
@@ -68,9 +111,19 @@ app.add_middleware(
         "/payment",
         "/subscription",
     ],
+    # Optional: Encrypt only selected fields on large responses
+    # (the rest of the document stays plain JSON)
+    # field_encryption_specs={
+    #     "/profile": ["$.access_token", "$.refresh_token", "$.payment.*"],
+    # },
+    # Optional: GET responses cached per user (plaintext, re-encrypted on every hit;
+    # dropped when the same user writes to the route)
+    # cached_endpoints=["/profile", "/subscription", "/user/settings"],
+    # cache_invalidations={"/payment": ["/subscription"]},
     # Optional: Customize public endpoints
     public_endpoints=[
         "/health",
+        "/ready",
         "/",
         "/docs",
         "/redoc",
@@ -78,32 +131,9 @@ app.add_middleware(
     ]
 )
 
-# Add security headers middleware
-app.add_middleware(SecurityHeadersMiddleware)
-
 
 # ==============================================
-# 2. CORS MIDDLEWARE (Your existing CORS setup)
-# ==============================================
-# This should come AFTER encryption middleware
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "https://betterandbliss.com",
-        "https://www.betterandbliss.com",
-        "http://localhost:5173",  # Vite dev server
-        "http://localhost:3000",  # React dev server
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-)
-
-
-# ==============================================
-# 3. REGISTER ROUTES (Your existing routes)
+# 2. REGISTER ROUTES (Your existing routes)
 # ==============================================
 
 # Example route registration (adapt to your actual routes)
@@ -112,25 +142,20 @@ app.add_middleware(
 # app.include_router(streaming.router, prefix="/api/streaming", tags=["Streaming"])
 # app.include_router(newsletter.router, prefix="/api/newsletter", tags=["Newsletter"])
 
+# Local media streaming (passed through the encryption middleware untouched)
+app.include_router(media.router, prefix=media.MediaConfig.ROUTE_PREFIX, tags=["Media"])
+
 
 # ==============================================
-# 4. HEALTH CHECK ENDPOINT
+# 3. HEALTH CHECK ENDPOINTS
 # ==============================================
+# /health (alive, warm, crypto self-test passing) and /ready (also not
+# saturated) return the readiness monitor's cached snapshot; both are public
+# and never encrypted, and only say which checks fail. Point load balancer
+# health checks at /ready. The measurements behind them are served by
+# /health/details to requests carrying X-Health-Token: $API_HEALTH_DETAILS_TOKEN.
 
-@app.get("/health")
-async def health_check():
-    """
-    Health check endpoint
-    This endpoint is public and not encrypted
-    """
-    from app.utils.encryption import EncryptionConfig
-
-    return {
-        "status": "healthy",
-        "service": "Better & Bliss API",
-        "encryption_enabled": EncryptionConfig.ENCRYPTION_ENABLED,
-        "version": "2.0.0"
-    }
+app.include_router(health.router, tags=["Health"])
 
 
 @app.get("/")
@@ -144,12 +169,13 @@ async def root():
         "version": "2.0.0",
         "docs": "/api/docs",
         "health": "/health",
+        "ready": "/ready",
         "encryption": "enabled"
     }
 
 
 # ==============================================
-# 5. EXAMPLE: PROTECTED ROUTE WITH ENCRYPTION
+# 4. EXAMPLE: PROTECTED ROUTE WITH ENCRYPTION
 # ==============================================
 
 from pydantic import BaseModel
@@ -200,7 +226,7 @@ async def login(request: LoginRequest):
 
 
 # ==============================================
-# 6. ERROR HANDLERS
+# 5. ERROR HANDLERS
 # ==============================================
 
 @app.exception_handler(Exception)
@@ -230,6 +256,11 @@ To run with encryption:
 2. Run the app:
    uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
 
+   Behind a load balancer or reverse proxy, trust its X-Forwarded-For so
+   clients are told apart (the decryption-failure limiter is per client IP):
+   uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers 4 \
+       --proxy-headers --forwarded-allow-ips "10.0.0.0/8"
+
 3. Test with encrypted requests:
    - Frontend will automatically encrypt requests
    - Middleware will automatically decrypt/encrypt
@@ -244,5 +275,8 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        # Client IPs from X-Forwarded-For, only when sent by these proxy addresses
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
     )
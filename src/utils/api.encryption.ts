@@ -43,6 +43,7 @@ export interface EncryptedPayload {
   encrypted: string;      // Base64 encoded encrypted data
   iv: string;             // Base64 encoded initialization vector
   tag?: string;           // Base64 encoded authentication tag (for GCM)
+  salt: string;           // Base64 encoded PBKDF2 salt
   timestamp: number;      // Request timestamp
   signature: string;      // HMAC signature for integrity
 }
@@ -174,6 +175,7 @@ export async function encryptData(data: any): Promise<EncryptedPayload> {
       encrypted: ab2base64(encryptedData),
       iv: ab2base64(iv),
       tag: ab2base64(tag),
+      salt: ab2base64(salt),
       timestamp,
       signature: '', // Will be set below
     };
@@ -205,8 +207,8 @@ export async function decryptData(payload: EncryptedPayload): Promise<any> {
       throw new Error('Payload expired');
     }
 
-    // Reconstruct salt from first part of IV (not ideal, but simplified)
-    const salt = generateSalt(); // In production, include salt in payload
+    // Derive key from the salt carried in the payload
+    const salt = new Uint8Array(base642ab(payload.salt));
     const key = await deriveKey(API_ENCRYPTION_CONFIG.ENCRYPTION_KEY, salt);
 
     // Decode Base64 values
@@ -245,9 +247,11 @@ export async function decryptData(payload: EncryptedPayload): Promise<any> {
 async function signPayload(payload: Omit<EncryptedPayload, 'signature'>): Promise<string> {
   try {
     // Create signature data (exclude signature field)
+    // Keys are in sorted order to match the backend's json.dumps(sort_keys=True)
     const signatureData = {
       encrypted: payload.encrypted,
       iv: payload.iv,
+      salt: payload.salt,
       tag: payload.tag,
       timestamp: payload.timestamp,
     };
@@ -284,9 +288,11 @@ async function signPayload(payload: Omit<EncryptedPayload, 'signature'>): Promis
 async function verifySignature(payload: EncryptedPayload): Promise<boolean> {
   try {
     // Create signature data (exclude signature field)
+    // Keys are in sorted order to match the backend's json.dumps(sort_keys=True)
     const signatureData = {
       encrypted: payload.encrypted,
       iv: payload.iv,
+      salt: payload.salt,
       tag: payload.tag,
       timestamp: payload.timestamp,
     };